@@ -1,49 +1,143 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from argparse import ArgumentParser
 from datetime import datetime
+from freed_capture import LOG_HEADER, CaptureReader, is_capture_file
+from freed_downsample import DOWNSAMPLE_METHODS, decimate_points, downsample_indices
+from freed_replayer import iter_log
+from freed_stats import LatencyHistogram, RunningStats, StreamTracker
 
-def load_and_process_log(log_file):
-    """Load and process the FreeD packet log file"""
-    # Read CSV file
-    df = pd.read_csv(log_file)
+# Columns whose range over the valid packets is reported
+POSITION_COLUMNS = ('x_pos', 'y_pos', 'z_pos')
+ROTATION_COLUMNS = ('pan', 'tilt', 'roll')
+
+# Packets averaged for the instantaneous packet rate
+RATE_WINDOW = 10
+
+# Points drawn per plotted series by default
+DEFAULT_MAX_POINTS = 5000
+
+# matplotlib 3.6 renamed the seaborn styles
+PLOT_STYLE = 'seaborn-v0_8' if 'seaborn-v0_8' in plt.style.available else 'seaborn'
+
+# Version of the cached column layout; bump it whenever the cached
+# columns, their types or the derived-column computations change
+CACHE_VERSION = 1
+
+def cache_path(log_file):
+    """Path of the columnar cache kept next to a CSV log"""
+    return f'{log_file}.cache.npz'
+
+def _cache_key(log_file):
+    """Cache version, size and mtime (ns) a cache must match to be used"""
+    stat = os.stat(log_file)
+    return np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+def load_log_cache(log_file):
+    """The processed DataFrame cached for a CSV log, or None if missing or stale"""
+    try:
+        with np.load(cache_path(log_file)) as cache:
+            if not np.array_equal(cache['key'], _cache_key(log_file)):
+                return None
+            columns = {name: cache[name] for name in cache.files if name != 'key'}
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    # Timestamps are stored as epoch nanoseconds
+    columns['timestamp'] = columns['timestamp'].view('datetime64[ns]')
+    return pd.DataFrame(columns)
+
+def save_log_cache(log_file, df, key):
+    """
+    Store a processed DataFrame as typed columns next to its CSV log. The
+    file is replaced atomically; a log in a read-only location is simply
+    not cached.
+    """
+    columns = {}
+    for name, values in df.items():
+        if name == 'timestamp':
+            columns[name] = values.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        else:
+            array = values.to_numpy()
+            # Strings (the source IP) as fixed-width text, which loads without pickle
+            columns[name] = array.astype(str) if array.dtype == object else array
+    path = cache_path(log_file)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            np.savez(f, key=key, **columns)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Not caching {log_file}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def load_and_process_log(log_file, use_cache=True):
+    """
+    Load and process the FreeD packet log file (CSV log or binary capture).
     
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    A parsed CSV log is cached next to it (see cache_path); later calls
+    load only that cache while the log's size and mtime still match it,
+    and rebuild it otherwise.
+    """
+    is_capture = is_capture_file(log_file)
+    if is_capture:
+        with CaptureReader(log_file) as capture:
+            df = capture.to_dataframe()
+    else:
+        if use_cache:
+            df = load_log_cache(log_file)
+            if df is not None:
+                return df
+        # Taken before parsing, so a log appended to meanwhile is re-parsed next time
+        key = _cache_key(log_file)
+        
+        # Read CSV file
+        df = pd.read_csv(log_file)
+        
+        # Convert timestamp to datetime
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
     
     # Calculate time differences between packets
     df['time_diff'] = df['timestamp'].diff().dt.total_seconds()
     
-    # Calculate instantaneous packet rate (rolling window of 10 packets)
-    df['packet_rate'] = 1 / df['time_diff'].rolling(window=10).mean()
+    # Calculate instantaneous packet rate (rolling window of RATE_WINDOW packets)
+    df['packet_rate'] = 1 / df['time_diff'].rolling(window=RATE_WINDOW).mean()
     
+    if use_cache and not is_capture:
+        save_log_cache(log_file, df, key)
     return df
 
-def plot_packet_analysis(df, output_prefix):
-    """Generate analysis plots from the packet data"""
-    # Set style
-    plt.style.use('seaborn')
-    
-    # Plot 1: Packet Rate over Time
-    plt.figure(figsize=(12, 6))
-    plt.plot(df['timestamp'], df['packet_rate'], label='Packet Rate')
-    plt.title('FreeD Packet Rate Over Time')
-    plt.xlabel('Time')
-    plt.ylabel('Packets per Second')
-    plt.grid(True)
-    plt.savefig(f'{output_prefix}_packet_rate.png')
-    plt.close()
-    
-    # Plot 2: Camera Position Trail (3D)
-    valid_data = df[df['valid'] == True]
-    if not valid_data.empty:
+def _downsample_series(timestamps, values, max_points, method):
+    """Finite points of a time series, downsampled to at most max_points"""
+    finite = np.isfinite(values)
+    timestamps, values = timestamps[finite], values[finite]
+    keep = downsample_indices(timestamps.view(np.int64), values, max_points, method)
+    return timestamps[keep], values[keep]
+
+def plot_packet_rate(path, timestamps, rate):
+    """Plot 1: Packet Rate over Time"""
+    with plt.style.context(PLOT_STYLE):
+        plt.figure(figsize=(12, 6))
+        plt.plot(timestamps, rate, label='Packet Rate')
+        plt.title('FreeD Packet Rate Over Time')
+        plt.xlabel('Time')
+        plt.ylabel('Packets per Second')
+        plt.grid(True)
+        plt.savefig(path)
+        plt.close()
+
+def plot_position_trail(path, x, y, z, order):
+    """Plot 2: Camera Position Trail (3D), colored by packet index"""
+    with plt.style.context(PLOT_STYLE):
         fig = plt.figure(figsize=(10, 10))
         ax = fig.add_subplot(111, projection='3d')
-        scatter = ax.scatter(valid_data['x_pos'], 
-                           valid_data['y_pos'], 
-                           valid_data['z_pos'],
-                           c=valid_data.index,
+        scatter = ax.scatter(x, y, z,
+                           c=order,
                            cmap='viridis',
                            alpha=0.6)
         plt.colorbar(scatter, label='Time')
@@ -51,74 +145,388 @@ def plot_packet_analysis(df, output_prefix):
         ax.set_ylabel('Y Position (mm)')
         ax.set_zlabel('Z Position (mm)')
         plt.title('Camera Position Trail')
-        plt.savefig(f'{output_prefix}_position_trail.png')
+        plt.savefig(path)
         plt.close()
-    
-    # Plot 3: Camera Rotation Over Time
-    if not valid_data.empty:
+
+def plot_rotation(path, series):
+    """Plot 3: Camera Rotation Over Time, from (label, timestamps, values) series"""
+    with plt.style.context(PLOT_STYLE):
         plt.figure(figsize=(12, 6))
-        plt.plot(valid_data['timestamp'], valid_data['pan'], label='Pan')
-        plt.plot(valid_data['timestamp'], valid_data['tilt'], label='Tilt')
-        plt.plot(valid_data['timestamp'], valid_data['roll'], label='Roll')
+        for label, timestamps, values in series:
+            plt.plot(timestamps, values, label=label)
         plt.title('Camera Rotation Over Time')
         plt.xlabel('Time')
         plt.ylabel('Degrees')
         plt.legend()
         plt.grid(True)
-        plt.savefig(f'{output_prefix}_rotation.png')
+        plt.savefig(path)
         plt.close()
 
+def _render_plot(job):
+    function, args = job
+    function(*args)
+
+def plot_packet_analysis(df, output_prefix, max_points=DEFAULT_MAX_POINTS,
+                         method='minmax', jobs=1):
+    """
+    Generate analysis plots from the packet data.
+    
+    Every time series is downsampled to at most max_points points with
+    `method` (see freed_downsample) and the 3D trail is decimated by
+    density to the same budget, so plotting time does not depend on the
+    log length. With jobs > 1 the figures are rendered in that many
+    worker processes, which receive only the downsampled arrays.
+    """
+    timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]')
+    plots = [(plot_packet_rate, (f'{output_prefix}_packet_rate.png',
+                                 *_downsample_series(timestamps, df['packet_rate'].to_numpy(dtype=np.float64),
+                                                     max_points, method)))]
+    
+    valid = (df['valid'] == True).to_numpy()
+    if valid.any():
+        order = np.flatnonzero(valid)
+        positions = df[['x_pos', 'y_pos', 'z_pos']].to_numpy(dtype=np.float64)[valid]
+        keep = decimate_points(positions, max_points)
+        plots.append((plot_position_trail, (f'{output_prefix}_position_trail.png',
+                                            *positions[keep].T, order[keep])))
+        
+        series = [(label, *_downsample_series(timestamps[valid], df[column].to_numpy(dtype=np.float64)[valid],
+                                              max_points, method))
+                  for label, column in (('Pan', 'pan'), ('Tilt', 'tilt'), ('Roll', 'roll'))]
+        plots.append((plot_rotation, (f'{output_prefix}_rotation.png', series)))
+    
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(plots))) as pool:
+            list(pool.map(_render_plot, plots))
+    else:
+        for plot in plots:
+            _render_plot(plot)
+
+class LogStatistics:
+    """
+    Single-pass statistics of a packet log, fed one DataFrame chunk at a
+    time in log order.
+    
+    Everything is kept in online accumulators (counts, ranges, a running
+    mean/variance and a log-bucketed histogram of the inter-arrival time,
+    the last RATE_WINDOW - 1 intervals for the rolling packet rate and a
+    StreamTracker per source for frame loss), so memory use does not
+    depend on the length of the log.
+    """
+    
+    def __init__(self, window: int = RATE_WINDOW):
+        self.window = window
+        self.total = 0
+        self.valid = 0
+        self.first = None        # Earliest and latest timestamp (ns)
+        self.last = None
+        self.ranges = {column: (float('inf'), float('-inf'))
+                       for column in POSITION_COLUMNS + ROTATION_COLUMNS}
+        self.intervals = RunningStats()       # Seconds
+        self.quantiles = LatencyHistogram()   # Nanoseconds
+        self.rate = RunningStats()            # Packets/second over `window` packets
+        self.streams = {}                     # (source IP, port) -> StreamTracker
+        self._previous = None    # Timestamp of the last packet seen (ns)
+        self._tail = np.empty(0, dtype=np.int64)  # Intervals still inside the rate window
+    
+    def update(self, df: pd.DataFrame) -> None:
+        """Add the next chunk of the log (in the CSV log schema)"""
+        if df.empty:
+            return
+        timestamps = df['timestamp'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+        self.total += len(df)
+        first, last = int(timestamps.min()), int(timestamps.max())
+        self.first = first if self.first is None else min(self.first, first)
+        self.last = last if self.last is None else max(self.last, last)
+        
+        valid = (df['valid'] == True).to_numpy()
+        count = int(valid.sum())
+        self.valid += count
+        if count:
+            for column, (low, high) in self.ranges.items():
+                values = df[column].to_numpy(dtype=np.float64)[valid]
+                self.ranges[column] = (min(low, float(np.nanmin(values))),
+                                       max(high, float(np.nanmax(values))))
+            
+            frames = df.loc[valid, 'frame'].astype(np.int64)
+            for source, source_frames in frames.groupby([df.loc[valid, 'source_ip'],
+                                                         df.loc[valid, 'source_port']], sort=False):
+                tracker = self.streams.get(source)
+                if tracker is None:
+                    tracker = self.streams[source] = StreamTracker()
+                update = tracker.update
+                for frame in source_frames.tolist():
+                    update(frame)
+        
+        if self._previous is not None:
+            intervals = np.diff(timestamps, prepend=self._previous)
+        else:
+            intervals = np.diff(timestamps)
+        self._previous = int(timestamps[-1])
+        self.intervals.update(intervals / 1e9)
+        self.quantiles.record_many(intervals)
+        
+        # Rolling rate: mean of the last `window` intervals, carried across chunks
+        intervals = np.concatenate((self._tail, intervals))
+        if len(intervals) >= self.window:
+            sums = np.cumsum(np.concatenate(([0], intervals)))
+            with np.errstate(divide='ignore'):
+                self.rate.update(self.window * 1e9 / (sums[self.window:] - sums[:-self.window]))
+        self._tail = intervals[max(0, len(intervals) - self.window + 1):]
+    
+    @property
+    def duration(self) -> float:
+        """Seconds between the earliest and latest packet"""
+        return (self.last - self.first) / 1e9 if self.total else 0.0
+    
+    @property
+    def lost(self) -> int:
+        """Frames skipped and never received, over all sources"""
+        return sum(tracker.lost for tracker in self.streams.values())
+    
+    @property
+    def expected(self) -> int:
+        """Frames the senders are believed to have sent"""
+        return sum(tracker.expected for tracker in self.streams.values())
+    
+    def print(self) -> None:
+        """Print the statistical analysis"""
+        print("\n=== FreeD Packet Analysis ===")
+        
+        duration = self.duration
+        print(f"\nBasic Statistics:")
+        print(f"Total Duration: {duration:.2f} seconds")
+        print(f"Total Packets: {self.total}")
+        print(f"Valid Packets: {self.valid}")
+        print(f"Invalid Packets: {self.total - self.valid}")
+        if duration:
+            print(f"Average Packet Rate: {self.total/duration:.2f} packets/second")
+        if self.streams:
+            expected = self.expected
+            print(f"Frames Lost: {self.lost} ({self.lost / expected * 100 if expected else 0:.2f}%) "
+                  f"from {len(self.streams)} source(s)")
+        
+        if self.intervals.count:
+            intervals = self.intervals
+            print(f"\nTiming (ms):")
+            print(f"Inter-arrival: mean {intervals.mean * 1e3:.3f}, std {intervals.std * 1e3:.3f}, "
+                  f"min {intervals.min * 1e3:.3f}, max {intervals.max * 1e3:.3f}")
+            print(f"Inter-arrival quantiles: {self.quantiles.summary()}")
+        if self.rate.count:
+            print(f"Rolling Rate ({self.window} packets): {self.rate.min:.2f} to {self.rate.max:.2f}, "
+                  f"mean {self.rate.mean:.2f} packets/second")
+        
+        # Position and rotation stats for valid packets
+        if self.valid:
+            ranges = self.ranges
+            print(f"\nPosition Range (mm):")
+            print(f"X: {ranges['x_pos'][0]:.2f} to {ranges['x_pos'][1]:.2f}")
+            print(f"Y: {ranges['y_pos'][0]:.2f} to {ranges['y_pos'][1]:.2f}")
+            print(f"Z: {ranges['z_pos'][0]:.2f} to {ranges['z_pos'][1]:.2f}")
+            
+            print(f"\nRotation Range (degrees):")
+            print(f"Pan: {ranges['pan'][0]:.2f} to {ranges['pan'][1]:.2f}")
+            print(f"Tilt: {ranges['tilt'][0]:.2f} to {ranges['tilt'][1]:.2f}")
+            print(f"Roll: {ranges['roll'][0]:.2f} to {ranges['roll'][1]:.2f}")
+
+def stream_statistics(log_file, chunk_size=100000):
+    """Compute LogStatistics of a log (CSV or capture) in one pass over chunks"""
+    stats = LogStatistics()
+    for df, _ in iter_log(log_file, chunk_size):
+        stats.update(df)
+    return stats
+
 def print_statistics(df):
     """Print statistical analysis of the packet data"""
-    print("\n=== FreeD Packet Analysis ===")
-    
-    # Basic stats
-    total_packets = len(df)
-    valid_packets = df['valid'].sum()
-    duration = (df['timestamp'].max() - df['timestamp'].min()).total_seconds()
-    
-    print(f"\nBasic Statistics:")
-    print(f"Total Duration: {duration:.2f} seconds")
-    print(f"Total Packets: {total_packets}")
-    print(f"Valid Packets: {valid_packets}")
-    print(f"Invalid Packets: {total_packets - valid_packets}")
-    print(f"Average Packet Rate: {total_packets/duration:.2f} packets/second")
-    
-    # Position and rotation stats for valid packets
-    valid_data = df[df['valid'] == True]
-    if not valid_data.empty:
-        print(f"\nPosition Range (mm):")
-        print(f"X: {valid_data['x_pos'].min():.2f} to {valid_data['x_pos'].max():.2f}")
-        print(f"Y: {valid_data['y_pos'].min():.2f} to {valid_data['y_pos'].max():.2f}")
-        print(f"Z: {valid_data['z_pos'].min():.2f} to {valid_data['z_pos'].max():.2f}")
-        
-        print(f"\nRotation Range (degrees):")
-        print(f"Pan: {valid_data['pan'].min():.2f} to {valid_data['pan'].max():.2f}")
-        print(f"Tilt: {valid_data['tilt'].min():.2f} to {valid_data['tilt'].max():.2f}")
-        print(f"Roll: {valid_data['roll'].min():.2f} to {valid_data['roll'].max():.2f}")
+    stats = LogStatistics()
+    stats.update(df)
+    stats.print()
+
+def analyze_session(log_file, stream=False, chunk_size=100000, use_cache=True):
+    """LogStatistics of one log, loaded whole (and cached) or streamed"""
+    if stream:
+        return stream_statistics(log_file, chunk_size)
+    stats = LogStatistics()
+    stats.update(load_and_process_log(log_file, use_cache))
+    return stats
+
+def is_csv_log(path):
+    """Whether a file starts with the CSV log header (unlike e.g. a summary table)"""
+    with open(path, 'rb') as f:
+        return f.readline().decode('utf-8', 'replace').strip() == LOG_HEADER.strip()
 
-def main():
+def find_session_logs(directory):
+    """CSV logs and binary captures directly inside a directory, by name"""
+    logs = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and ((name.lower().endswith('.csv') and is_csv_log(path))
+                                     or is_capture_file(path)):
+            logs.append(path)
+    return logs
+
+def session_summary(name, stats):
+    """One row of the session summary table"""
+    duration = stats.duration
+    expected = stats.expected
+    row = {
+        'session': name,
+        'packets': stats.total,
+        'valid': stats.valid,
+        'duration_s': duration,
+        'rate_pps': stats.total / duration if duration else float('nan'),
+        'lost': stats.lost,
+        'expected': expected,
+        'loss_pct': stats.lost / expected * 100 if expected else float('nan'),
+        'jitter_ms': stats.intervals.std * 1e3 if stats.intervals.count > 1 else float('nan'),
+        'p99_interval_ms': stats.quantiles.percentile(99) / 1e6 if stats.quantiles.count else float('nan'),
+    }
+    for column, (low, high) in stats.ranges.items():
+        row[f'{column}_min'] = low if stats.valid else float('nan')
+        row[f'{column}_max'] = high if stats.valid else float('nan')
+    return row
+
+def summary_table(rows):
+    """
+    DataFrame of session summaries with a final 'ALL' row merging them:
+    totals, overall rate and loss, and the union of the pose ranges.
+    Jitter and p99 do not merge from per-session summaries and are left
+    empty.
+    """
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    total = {
+        'session': 'ALL',
+        'packets': table['packets'].sum(),
+        'valid': table['valid'].sum(),
+        'duration_s': table['duration_s'].sum(),
+        'lost': table['lost'].sum(),
+        'expected': table['expected'].sum(),
+    }
+    total['rate_pps'] = total['packets'] / total['duration_s'] if total['duration_s'] else float('nan')
+    total['loss_pct'] = total['lost'] / total['expected'] * 100 if total['expected'] else float('nan')
+    for column in POSITION_COLUMNS + ROTATION_COLUMNS:
+        total[f'{column}_min'] = table[f'{column}_min'].min()
+        total[f'{column}_max'] = table[f'{column}_max'].max()
+    return pd.concat([table, pd.DataFrame([total])], ignore_index=True)
+
+def print_summary_table(table):
+    """Print the session summary table with one range column per axis"""
+    def span(row, column, precision):
+        low, high = row[f'{column}_min'], row[f'{column}_max']
+        return '-' if pd.isna(low) else f'{low:.{precision}f}..{high:.{precision}f}'
+    
+    def number(value, precision):
+        return '-' if pd.isna(value) else f'{value:.{precision}f}'
+    
+    headers = ['Session', 'Packets', 'Valid', 'Duration s', 'Rate pps', 'Loss %', 'Jitter ms', 'p99 ms',
+               'X mm', 'Y mm', 'Z mm', 'Pan', 'Tilt', 'Roll']
+    lines = [[str(row['session']), str(row['packets']), str(row['valid']),
+              number(row['duration_s'], 1), number(row['rate_pps'], 1), number(row['loss_pct'], 2),
+              number(row['jitter_ms'], 3), number(row['p99_interval_ms'], 3)] +
+             [span(row, column, 0) for column in POSITION_COLUMNS] +
+             [span(row, column, 1) for column in ROTATION_COLUMNS]
+             for _, row in table.iterrows()]
+    widths = [max(len(header), *(len(line[index]) for line in lines)) for index, header in enumerate(headers)]
+    
+    print("\n=== FreeD Session Summary ===\n")
+    print('  '.join(header.ljust(width) if index == 0 else header.rjust(width)
+                    for index, (header, width) in enumerate(zip(headers, widths))))
+    for line in lines:
+        print('  '.join(cell.ljust(width) if index == 0 else cell.rjust(width)
+                        for index, (cell, width) in enumerate(zip(line, widths))))
+
+def analyze_directory(directory, jobs=1, **options):
+    """
+    Analyze every log in a directory with analyze_session (options are
+    passed through), in `jobs` worker processes. Returns the summary rows
+    in file name order; logs that fail are reported and left out.
+    """
+    logs = find_session_logs(directory)
+    results = {}
+    
+    def collect(path, compute):
+        try:
+            results[path] = compute()
+            print(f"Analyzed {os.path.basename(path)} ({len(results)}/{len(logs)})")
+        except Exception as e:
+            print(f"Error analyzing {path}: {e}")
+    
+    if jobs > 1 and len(logs) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(logs))) as pool:
+            futures = {pool.submit(analyze_session, path, **options): path for path in logs}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+    else:
+        for path in logs:
+            collect(path, lambda: analyze_session(path, **options))
+    return [session_summary(os.path.basename(path), results[path]) for path in logs if path in results]
+
+def main(argv=None):
     parser = ArgumentParser(description='Analyze FreeD packet log data')
-    parser.add_argument('log_file', help='Path to the FreeD packet log CSV file')
+    parser.add_argument('log_file', nargs='?', help='Path to the FreeD packet log CSV file')
+    parser.add_argument('--dir', metavar='PATH',
+                      help='Analyze every CSV log and capture in this directory and print '
+                           'a merged session summary table instead (no plots)')
+    parser.add_argument('--jobs', type=int, default=1,
+                      help='Worker processes for --dir (default: 1)')
     parser.add_argument('--output', default='freed_analysis',
                       help='Prefix for output files (default: freed_analysis)')
+    parser.add_argument('--stream', action='store_true',
+                      help='Compute the statistics in one pass over chunks of the log, '
+                           'in memory independent of its length (no plots)')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                      help='Log rows read at a time with --stream (default: 100000)')
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS,
+                      help='Points drawn per plotted series; longer series are '
+                           f'downsampled (default: {DEFAULT_MAX_POINTS})')
+    parser.add_argument('--downsample', choices=DOWNSAMPLE_METHODS, default='minmax',
+                      help='Time-series downsampling: per-bucket min/max, which keeps every '
+                           'spike, or largest-triangle-three-buckets (default: minmax)')
+    parser.add_argument('--plot-jobs', type=int, default=1,
+                      help='Render the plots in this many worker processes (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Parse the CSV log without reading or writing its '
+                           '.cache.npz columnar cache')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if (args.log_file is None) == (args.dir is None):
+        parser.error('give either a log file or --dir')
     
     try:
+        if args.dir:
+            print(f"Analyzing logs in {args.dir} with {args.jobs} job(s)...")
+            rows = analyze_directory(args.dir, args.jobs, stream=args.stream,
+                                     chunk_size=args.chunk_size, use_cache=not args.no_cache)
+            if not rows:
+                print("No logs analyzed.")
+                return 1
+            table = summary_table(rows)
+            print_summary_table(table)
+            table.to_csv(f'{args.output}_summary.csv', index=False)
+            print(f"\nAnalysis complete. Summary saved to {args.output}_summary.csv")
+            return 0
+        
+        if args.stream:
+            print(f"Streaming data from {args.log_file}...")
+            stream_statistics(args.log_file, args.chunk_size).print()
+            print("\nAnalysis complete.")
+            return 0
+        
         # Load and process data
         print(f"Loading data from {args.log_file}...")
-        df = load_and_process_log(args.log_file)
+        df = load_and_process_log(args.log_file, use_cache=not args.no_cache)
         
         # Generate analysis
         print("Generating statistical analysis...")
         print_statistics(df)
         
         print("\nGenerating plots...")
-        plot_packet_analysis(df, args.output)
+        plot_packet_analysis(df, args.output, args.max_points, args.downsample, args.plot_jobs)
         
         print(f"\nAnalysis complete. Output files saved with prefix: {args.output}")
-        
+    
     except Exception as e:
         print(f"Error analyzing log file: {e}")
         return 1
@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import platform
+import re
+import select
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from importlib import metadata
+
+# Bump whenever a benchmark's definition or inputs change, so results of
+# different suites are not compared by accident
+SUITE_VERSION = 1
+
+# A benchmark: setup(context) returns (function to time, items processed
+# per call), optionally followed by a function returning extra result
+# fields once timing is done. Setups import what they measure, so
+# selecting a few cheap benchmarks does not load pandas.
+Benchmark = namedtuple('Benchmark', ['name', 'setup'])
+
+# Fixed inputs: frame 1000, X 1024 mm, Y -512 mm, Z 2048 mm, pan 0.5,
+# tilt -0.33, zoom 1.0, focus 0.5
+LENS_PACKET = bytes.fromhex(
+    '440102' '000003E8' '00010000' 'FFFF8000' '00020000'
+    '00004000' 'FFFFD555' '00000000' '00008000' '00004000'
+)
+SOURCE = ('127.0.0.1', 6000)
+LOG_START = 1_700_000_000.0   # Synthetic log epoch
+LOG_RATE = 240                # Synthetic log packet rate (Hz)
+RECEIVE_BURST = 64            # Datagrams queued per receive benchmark call
+
+class BenchContext:
+    """Shared synthetic inputs of one run, built on first use"""
+    
+    def __init__(self, rows: int, directory: str):
+        self.rows = rows
+        self.directory = directory
+        self._log_file = None
+        self._log_frame = None
+        self._sockets = None
+    
+    def loopback_pair(self):
+        """A connected (sender, non-blocking receiver) UDP pair on 127.0.0.1"""
+        if self._sockets is None:
+            receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            receiver.bind(('127.0.0.1', 0))
+            receiver.setblocking(False)
+            sender.connect(receiver.getsockname())
+            self._sockets = (sender, receiver)
+        return self._sockets
+    
+    def close(self) -> None:
+        if self._sockets is not None:
+            for sock in self._sockets:
+                sock.close()
+            self._sockets = None
+    
+    def log_file(self) -> str:
+        """A seeded synthetic CSV log of `rows` packets"""
+        if self._log_file is None:
+            from freed_simulator import generate_capture
+            
+            self._log_file = os.path.join(self.directory, 'bench.csv')
+            generate_capture([self._log_file], 'circle', self.rows / LOG_RATE, LOG_RATE,
+                             noise=0.5, angle_noise=0.05, jitter=0.0005, seed=0,
+                             source=SOURCE, start=LOG_START)
+        return self._log_file
+    
+    def log_frame(self):
+        """The synthetic log, parsed"""
+        if self._log_frame is None:
+            from analyze_freed_log import load_and_process_log
+            
+            self._log_frame = load_and_process_log(self.log_file(), use_cache=False)
+        return self._log_frame
+
+def _parse(data):
+    def setup(context):
+        from freed_codec import parse_freed_packet
+        return (lambda: parse_freed_packet(data)), 1
+    return setup
+
+def _create_packet(context):
+    from freed_replayer import create_freed_packet
+    return (lambda: create_freed_packet(1000, 1024.0, -512.0, 2048.0, 0.5, -0.33, 0.0, 1.0, 0.5)), 1
+
+def _encode_packet_into(context):
+    from freed_codec import encode_freed_packet_into
+    buffer = bytearray(len(LENS_PACKET))
+    return (lambda: encode_freed_packet_into(buffer, 0, 1000, 1024.0, -512.0, 2048.0,
+                                             0.5, -0.33, 0.0, 1.0, 0.5)), 1
+
+def _pattern(name):
+    def setup(context):
+        from freed_simulator import PATTERNS
+        function = PATTERNS[name]
+        return (lambda: function(1.234)), 1
+    return setup
+
+def _format_log_row(context):
+    from freed_test_runner import format_log_row
+    from freed_codec import parse_freed_packet
+    entry = (LOG_START, SOURCE, parse_freed_packet(LENS_PACKET)[0], True)
+    return (lambda: format_log_row(entry)), 1
+
+def _background_log(context):
+    from freed_capture import BackgroundWriter
+    from freed_test_runner import format_log_row
+    from freed_codec import parse_freed_packet
+    packet = parse_freed_packet(LENS_PACKET)[0]
+    entries = [(LOG_START + index / LOG_RATE, SOURCE, packet, True) for index in range(context.rows)]
+    path = os.path.join(context.directory, 'bench_log.csv')
+    
+    def run():
+        # The network_test_mode logging path: queue, format on the writer thread, write
+        writer = BackgroundWriter(open(path, 'w'), max_queue=len(entries) + 1,
+                                  formatter=format_log_row)
+        write = writer.write
+        for entry in entries:
+            write(entry)
+        writer.close()
+    return run, context.rows
+
+def _encode_replay(context):
+    from freed_replayer import encode_replay
+    df = context.log_frame()
+    return (lambda: encode_replay(df)), len(df)
+
+def _per_datagram(counts):
+    return lambda: {f'{name}_per_item': counts[name] / counts['datagrams']
+                    for name in ('syscalls', 'wakeups')}
+
+def _receive_recvfrom(context):
+    # The receive loop before RecvPool: one select() and one recvfrom()
+    # per datagram
+    sender, receiver = context.loopback_pair()
+    counts = {'datagrams': 0, 'syscalls': 0, 'wakeups': 0}
+    
+    def run():
+        for _ in range(RECEIVE_BURST):
+            sender.send(LENS_PACKET)
+        for _ in range(RECEIVE_BURST):
+            select.select([receiver], [], [], 1.0)
+            receiver.recvfrom(4096)
+        counts['datagrams'] += RECEIVE_BURST
+        counts['syscalls'] += RECEIVE_BURST
+        counts['wakeups'] += RECEIVE_BURST
+    return run, RECEIVE_BURST, _per_datagram(counts)
+
+def _receive_recvpool(context):
+    from freed_codec import RecvPool
+    sender, receiver = context.loopback_pair()
+    pool = RecvPool()
+    
+    def run():
+        for _ in range(RECEIVE_BURST):
+            sender.send(LENS_PACKET)
+        received = 0
+        while received < RECEIVE_BURST:
+            received += len(pool.receive(receiver, 1.0))
+    return run, RECEIVE_BURST, _per_datagram(vars(pool))
+
+def _load_log(use_cache):
+    def setup(context):
+        from analyze_freed_log import load_and_process_log
+        path = context.log_file()
+        if use_cache:
+            load_and_process_log(path)  # Build the cache once
+        return (lambda: load_and_process_log(path, use_cache=use_cache)), context.rows
+    return setup
+
+BENCHMARKS = [
+    Benchmark('parse_freed_packet/valid', _parse(LENS_PACKET)),
+    Benchmark('parse_freed_packet/valid_no_lens', _parse(LENS_PACKET[:31])),
+    Benchmark('parse_freed_packet/invalid_id', _parse(b'\x45' + LENS_PACKET[1:])),
+    Benchmark('parse_freed_packet/truncated', _parse(LENS_PACKET[:37])),
+    Benchmark('create_freed_packet', _create_packet),
+    Benchmark('encode_freed_packet_into', _encode_packet_into),
+    Benchmark('pattern/circle', _pattern('circle')),
+    Benchmark('pattern/figure8', _pattern('figure8')),
+    Benchmark('pattern/oscillate', _pattern('oscillate')),
+    Benchmark('csv_log/format_log_row', _format_log_row),
+    Benchmark('csv_log/background_writer', _background_log),
+    Benchmark('receive/recvfrom', _receive_recvfrom),
+    Benchmark('receive/recvpool_drain', _receive_recvpool),
+    Benchmark('replay/encode_replay', _encode_replay),
+    Benchmark('analyze/load_csv', _load_log(False)),
+    Benchmark('analyze/load_cached', _load_log(True)),
+]
+
+def measure(function, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Time function() like timeit: calls per sample grow tenfold until one
+    sample takes at least min_time, then `repeat` samples are taken.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 10 ** 7:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        'number': number,
+        'repeat': len(samples),
+        'best_s': min(samples),
+        'median_s': statistics.median(samples),
+        'stdev_s': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+def _package_version(name: str):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+def environment() -> dict:
+    """Interpreter, platform and dependency versions a result depends on"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': _package_version('numpy'),
+        'pandas': _package_version('pandas'),
+    }
+
+def run_suite(pattern: str = '', rows: int = 100000, repeat: int = 5,
+              min_time: float = 0.2, progress=None) -> dict:
+    """
+    Run the benchmarks whose name matches the regular expression `pattern`
+    and return the result document. Inputs are fixed (seeded synthetic
+    logs at a fixed epoch), so runs differ only by the code and machine.
+    """
+    selected = [benchmark for benchmark in BENCHMARKS if re.search(pattern, benchmark.name)]
+    results = []
+    with tempfile.TemporaryDirectory(prefix='freed-bench-') as directory:
+        context = BenchContext(rows, directory)
+        try:
+            for benchmark in selected:
+                function, items, *extra = benchmark.setup(context)
+                result = {'name': benchmark.name, 'items': items, **measure(function, repeat, min_time)}
+                result['ns_per_item'] = result['best_s'] / items * 1e9
+                result['items_per_s'] = items / result['best_s'] if result['best_s'] else None
+                for fields in extra:
+                    result.update(fields())
+                results.append(result)
+                if progress:
+                    progress(result)
+        finally:
+            context.close()
+    return {
+        'suite': 'freed-bench',
+        'suite_version': SUITE_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'options': {'filter': pattern, 'rows': rows, 'repeat': repeat, 'min_time': min_time},
+        'environment': environment(),
+        'results': results,
+    }
+
+def format_result(result: dict) -> str:
+    """One human-readable result line"""
+    line = (f"{result['name']:<36} {result['ns_per_item']:>12.1f} ns/item "
+            f"{result['items_per_s']:>14,.0f} items/s  ({result['number']} x {result['repeat']})")
+    if 'syscalls_per_item' in result:
+        line += (f"  {result['syscalls_per_item']:.2f} syscalls, "
+                 f"{result['wakeups_per_item']:.3f} wakeups/item")
+    return line
+
+def compare(baseline: dict, current: dict) -> list:
+    """(name, baseline ns/item, current ns/item, current/baseline) per shared benchmark"""
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    rows = []
+    for result in current['results']:
+        before = previous.get(result['name'])
+        if before:
+            rows.append((result['name'], before['ns_per_item'], result['ns_per_item'],
+                         result['ns_per_item'] / before['ns_per_item']))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the FreeD toolkit microbenchmarks')
+    parser.add_argument('--filter', default='', metavar='REGEX',
+                      help='Only run benchmarks whose name matches (default: all)')
+    parser.add_argument('--rows', type=int, default=100000,
+                      help='Packets in the synthetic logs (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                      help='Timing samples per benchmark (default: 5)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                      help='Minimum seconds per sample (default: 0.2)')
+    parser.add_argument('--output', default='-',
+                      help='Write the JSON results here (default: - for stdout)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                      help='Compare against the JSON results of an earlier run')
+    parser.add_argument('--list', action='store_true',
+                      help='List the benchmarks and exit')
+    
+    args = parser.parse_args(argv)
+    
+    if args.list:
+        for benchmark in BENCHMARKS:
+            print(benchmark.name)
+        return 0
+    
+    # Keep stdout pure JSON when the results go there
+    report = sys.stderr if args.output == '-' else sys.stdout
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('suite_version') != SUITE_VERSION:
+            print(f"Warning: baseline is from suite version {baseline.get('suite_version')}, "
+                  f"this is {SUITE_VERSION}", file=report)
+    
+    try:
+        document = run_suite(args.filter, args.rows, args.repeat, args.min_time,
+                             progress=lambda result: print(format_result(result), file=report, flush=True))
+    except Exception as e:
+        print(f"Error running benchmarks: {e}", file=sys.stderr)
+        return 1
+    if not document['results']:
+        print(f"No benchmarks match {args.filter!r}", file=sys.stderr)
+        return 1
+    
+    text = json.dumps(document, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"Results saved to {args.output}", file=report)
+    
+    if baseline is not None:
+        print(f"\nCompared with {args.compare} (ratio < 1 is faster):", file=report)
+        for name, before, after, ratio in compare(baseline, document):
+            print(f"{name:<36} {before:>12.1f} -> {after:>12.1f} ns/item  {ratio:6.2f}x", file=report)
+    
+    return 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+import mmap
+import queue
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from freed_codec import FreeDColumns, decode_freed_records, freed_record_fields
+
+# Binary capture format
+#
+# Header (16 bytes, little-endian):
+#   magic (8s) | format version (H) | header size (H) | record size (H) | payload size (H)
+#
+# Records (64 bytes each, little-endian unless noted):
+#   timestamp_ns (Q)   Receive time, nanoseconds since the Unix epoch
+#   source_ip (4s)     IPv4 source address, network byte order
+#   source_port (H)    UDP source port
+#   valid (B)          1 if the packet passed validation when captured
+#   length (B)         Datagram length (capped at 255)
+#   payload (48s)      Raw datagram, truncated/zero-padded to 48 bytes
+CAPTURE_MAGIC = b'FREEDCAP'
+CAPTURE_VERSION = 1
+HEADER_STRUCT = struct.Struct('<8sHHHH')
+RECORD_STRUCT = struct.Struct('<Q4sHBB48s')
+PAYLOAD_OFFSET = 16
+PAYLOAD_SIZE = 48
+
+# Header line of the CSV packet log written by network_test_mode
+LOG_HEADER = "timestamp,source_ip,source_port,valid,frame,x_pos,y_pos,z_pos,pan,tilt,roll,zoom,focus\n"
+
+def capture_dtype():
+    """
+    NumPy dtype of one capture record. The FreeD packet fields inside the
+    payload are exposed as additional (overlapping) fields.
+    """
+    import numpy as np
+    
+    freed = freed_record_fields(39, offset=PAYLOAD_OFFSET)
+    return np.dtype({
+        'names': ['timestamp_ns', 'source_ip', 'source_port', 'valid', 'length', 'payload']
+                 + freed['names'],
+        'formats': ['<u8', '>u4', '<u2', 'u1', 'u1', ('u1', PAYLOAD_SIZE)] + freed['formats'],
+        'offsets': [0, 8, 12, 14, 15, PAYLOAD_OFFSET] + freed['offsets'],
+        'itemsize': RECORD_STRUCT.size
+    })
+
+def is_capture_file(path: str) -> bool:
+    """Check whether a file starts with the binary capture magic"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(CAPTURE_MAGIC)) == CAPTURE_MAGIC
+    except OSError:
+        return False
+
+class BackgroundWriter:
+    """
+    Writes to a file from a dedicated thread so producers never wait on I/O.
+    
+    write() only enqueues into a bounded queue; when the queue is full the
+    item is dropped and counted instead of blocking the caller. The writer
+    thread drains the queue in batches, optionally converting each item
+    with `formatter` (so formatting cost also leaves the producer thread),
+    and flushes once `flush_bytes` have been written or `flush_interval`
+    seconds have passed since the last flush.
+    """
+    
+    def __init__(self, file, max_queue: int = 65536, flush_interval: float = 1.0,
+                 flush_bytes: int = 1 << 20, formatter: Optional[Callable] = None):
+        self.file = file
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.formatter = formatter
+        self.written = 0      # Items written to the file
+        self.dropped = 0      # Items dropped because the queue was full
+        self.high_water = 0   # Largest queue backlog observed
+        self._queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name='freed-writer', daemon=True)
+        self._thread.start()
+    
+    @property
+    def backlog(self) -> int:
+        """Items currently waiting to be written"""
+        return self._queue.qsize()
+    
+    def write(self, item) -> bool:
+        """Queue an item for writing. Returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        backlog = self._queue.qsize()
+        if backlog > self.high_water:
+            self.high_water = backlog
+        return True
+    
+    def _run(self) -> None:
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        formatter = self.formatter
+        pending = 0
+        last_flush = time.monotonic()
+        running = True
+        
+        while running:
+            batch = []
+            try:
+                batch.append(get(timeout=self.flush_interval))
+                while len(batch) < 4096:
+                    batch.append(get_nowait())
+            except queue.Empty:
+                pass
+            
+            if batch and batch[-1] is None:  # Sentinel from close()
+                batch.pop()
+                running = False
+            if batch:
+                if formatter is not None:
+                    batch = [formatter(item) for item in batch]
+                chunk = batch[0][:0].join(batch)
+                self.file.write(chunk)
+                self.written += len(batch)
+                pending += len(chunk)
+            
+            now = time.monotonic()
+            if pending and (pending >= self.flush_bytes or now - last_flush >= self.flush_interval
+                            or not running):
+                self.file.flush()
+                pending = 0
+                last_flush = now
+    
+    def close(self) -> None:
+        """Write everything still queued, then stop the thread and close the file"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.file.close()
+
+class CaptureWriter:
+    """
+    Append-only writer for binary capture files.
+    With background=True, records are written by a BackgroundWriter
+    thread (keyword arguments are passed through to it).
+    """
+    
+    def __init__(self, path: str, background: bool = False, **writer_options):
+        self.path = path
+        self.records = 0
+        self._file = open(path, 'wb')
+        self._file.write(HEADER_STRUCT.pack(CAPTURE_MAGIC, CAPTURE_VERSION, HEADER_STRUCT.size,
+                                            RECORD_STRUCT.size, PAYLOAD_SIZE))
+        self.writer = BackgroundWriter(self._file, **writer_options) if background else None
+        self._write = self.writer.write if background else self._file.write
+        self._pack = RECORD_STRUCT.pack
+        self._addresses = {}
+    
+    def write(self, timestamp_ns: int, addr: Tuple[str, int], is_valid: bool, data) -> None:
+        """Append one received datagram"""
+        ip = self._addresses.get(addr[0])
+        if ip is None:
+            ip = self._addresses[addr[0]] = socket.inet_aton(addr[0])
+        if self._write(self._pack(timestamp_ns, ip, addr[1], is_valid,
+                                  min(len(data), 255), bytes(data[:PAYLOAD_SIZE]))):
+            self.records += 1
+    
+    def write_many(self, timestamps_ns, addr: Tuple[str, int], valid, packets: bytes,
+                   packet_size: int) -> None:
+        """
+        Append many datagrams from one source in a single vectorized step.
+        `packets` holds len(timestamps_ns) datagrams of packet_size bytes
+        each; `valid` is a per-record flag (or one flag for all).
+        """
+        import numpy as np
+        
+        records = np.zeros(len(timestamps_ns), dtype=capture_dtype())
+        records['timestamp_ns'] = timestamps_ns
+        records['source_ip'] = struct.unpack('>I', socket.inet_aton(addr[0]))[0]
+        records['source_port'] = addr[1]
+        records['valid'] = valid
+        records['length'] = min(packet_size, 255)
+        size = min(packet_size, PAYLOAD_SIZE)
+        records['payload'][:, :size] = np.frombuffer(packets, dtype=np.uint8).reshape(-1, packet_size)[:, :size]
+        if self._write(records.tobytes()):
+            self.records += len(records)
+    
+    def flush(self) -> None:
+        if self.writer is None:
+            self._file.flush()
+    
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        else:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CaptureReader:
+    """
+    Memory-mapped reader for binary capture files.
+    
+    `records` is a NumPy structured array viewing the mapped file
+    directly, so opening a capture costs the same regardless of its size.
+    Arrays derived from it that are still referenced at close() keep the
+    mapping alive until they are released.
+    """
+    
+    def __init__(self, path: str):
+        import numpy as np
+        
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f'{path}: empty file is not a capture')
+        
+        if len(self._mmap) < HEADER_STRUCT.size:
+            self.close()
+            raise ValueError(f'{path}: truncated capture header')
+        magic, version, header_size, record_size, _ = HEADER_STRUCT.unpack_from(self._mmap)
+        if magic != CAPTURE_MAGIC:
+            self.close()
+            raise ValueError(f'{path}: not a FreeD capture file')
+        if version != CAPTURE_VERSION or record_size != RECORD_STRUCT.size:
+            self.close()
+            raise ValueError(f'{path}: unsupported capture version {version}')
+        
+        self.version = version
+        # Ignore a trailing partial record left by an interrupted capture
+        count = (len(self._mmap) - header_size) // record_size
+        self.records = np.frombuffer(self._mmap, dtype=capture_dtype(),
+                                     count=count, offset=header_size)
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    @property
+    def timestamps_ns(self):
+        return self.records['timestamp_ns']
+    
+    @property
+    def valid(self):
+        return self.records['valid'].astype(bool)
+    
+    def source_ips(self, records=None):
+        """Source addresses (of `records`, by default all) as dotted-quad strings"""
+        import numpy as np
+        
+        raw = (self.records if records is None else records)['source_ip']
+        unique, inverse = np.unique(raw, return_inverse=True)
+        names = np.array([socket.inet_ntoa(struct.pack('>I', int(ip))) for ip in unique], dtype=object)
+        return names[inverse]
+    
+    def payload(self, index: int) -> bytes:
+        """Raw datagram bytes of one record"""
+        record = self.records[index]
+        return record['payload'][:min(int(record['length']), PAYLOAD_SIZE)].tobytes()
+    
+    def decode(self) -> FreeDColumns:
+        """Decode the FreeD fields of every record"""
+        return decode_freed_records(self.records)
+    
+    def to_dataframe(self, start: int = 0, stop: Optional[int] = None):
+        """
+        Build a DataFrame in the network_test_mode CSV log schema, of all
+        records or of records[start:stop]. Timestamps are naive UTC
+        datetimes; pose columns are NaN for invalid packets, as in the
+        CSV log.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        records = self.records[start:stop]
+        columns = decode_freed_records(records)
+        valid = records['valid'].astype(bool)
+        
+        def pose(values):
+            return np.where(valid, values, np.nan)
+        
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(records['timestamp_ns'], unit='ns'),
+            'source_ip': self.source_ips(records),
+            'source_port': np.array(records['source_port']),
+            'valid': valid,
+            'frame': pose(columns.frame_number),
+            'x_pos': pose(columns.x_pos),
+            'y_pos': pose(columns.y_pos),
+            'z_pos': pose(columns.z_pos),
+            'pan': pose(columns.pan),
+            'tilt': pose(columns.tilt),
+            'roll': pose(columns.roll),
+            'zoom': pose(columns.zoom),
+            'focus': pose(columns.focus),
+        })
+    
+    def close(self) -> None:
+        self.records = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Still exported; unmapped when the last view is freed
+            self._mmap = None
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,304 @@
+import argparse
+import select
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np  # Annotations only; numpy is imported where it is used
+
+# FreeD wire layout (big-endian): ID, type, version, frame number,
+# X/Y/Z position and pan/tilt/roll rotation, optionally followed by
+# zoom and focus. Precompiled so a packet decodes in a single call.
+PACKET_STRUCT = struct.Struct('>BBBIiiiiii')         # 31 bytes
+LENS_PACKET_STRUCT = struct.Struct('>BBBIiiiiiiii')  # 39 bytes
+PACKET_SIZE = LENS_PACKET_STRUCT.size  # Encoded packets always carry lens data
+_pack_lens_into = LENS_PACKET_STRUCT.pack_into
+
+@dataclass
+class FreeDPacket:
+    """FreeD protocol packet structure (version 2)"""
+    __slots__ = ('packet_id', 'packet_type', 'version', 'frame_number',
+                 'x_pos', 'y_pos', 'z_pos', 'pan', 'tilt', 'roll',
+                 'zoom', 'focus')
+    
+    packet_id: int      # Always 'D' (0x44)
+    packet_type: int    # 0x01 for position/rotation data
+    version: int        # Protocol version
+    frame_number: int   # Frame counter
+    x_pos: float       # Camera X position (mm)
+    y_pos: float       # Camera Y position (mm)
+    z_pos: float       # Camera Z position (mm)
+    pan: float         # Pan angle (degrees)
+    tilt: float        # Tilt angle (degrees)
+    roll: float        # Roll angle (degrees)
+    zoom: float        # Camera zoom
+    focus: float       # Camera focus
+    
+def parse_freed_packet(data: bytes) -> Tuple[FreeDPacket, bool]:
+    """
+    Parse a FreeD protocol packet and validate its structure.
+    Accepts any buffer (bytes, bytearray or memoryview).
+    Returns a tuple of (packet, is_valid).
+    """
+    size = len(data)
+    if size >= LENS_PACKET_STRUCT.size:
+        (packet_id, packet_type, version, frame_number,
+         x, y, z, pan, tilt, roll, zoom, focus) = LENS_PACKET_STRUCT.unpack_from(data)
+    elif PACKET_STRUCT.size <= size < 37:
+        # Lens fields absent; a truncated lens block (37-38 bytes) is invalid
+        (packet_id, packet_type, version, frame_number,
+         x, y, z, pan, tilt, roll) = PACKET_STRUCT.unpack_from(data)
+        zoom = focus = 0
+    else:
+        return None, False
+    
+    if packet_id != 0x44 or packet_type != 0x01:  # 'D', position/rotation data
+        return None, False
+    
+    packet = FreeDPacket(
+        packet_id, packet_type, version, frame_number,
+        x / 64.0, y / 64.0, z / 64.0,
+        pan / 32768.0, tilt / 32768.0, roll / 32768.0,
+        zoom / 32768.0, focus / 32768.0
+    )
+    return packet, True
+
+def parse_freed_packets(buffers: Iterable[bytes]) -> List[Tuple[FreeDPacket, bool]]:
+    """
+    Parse a batch of FreeD packets.
+    Equivalent to calling parse_freed_packet on each buffer, with the
+    per-call lookups hoisted out of the loop.
+    """
+    unpack = PACKET_STRUCT.unpack_from
+    unpack_lens = LENS_PACKET_STRUCT.unpack_from
+    short_size = PACKET_STRUCT.size
+    lens_size = LENS_PACKET_STRUCT.size
+    make_packet = FreeDPacket
+    invalid = (None, False)
+    
+    results = []
+    append = results.append
+    for data in buffers:
+        size = len(data)
+        if size >= lens_size:
+            (packet_id, packet_type, version, frame_number,
+             x, y, z, pan, tilt, roll, zoom, focus) = unpack_lens(data)
+        elif short_size <= size < 37:
+            (packet_id, packet_type, version, frame_number,
+             x, y, z, pan, tilt, roll) = unpack(data)
+            zoom = focus = 0
+        else:
+            append(invalid)
+            continue
+        
+        if packet_id != 0x44 or packet_type != 0x01:
+            append(invalid)
+            continue
+        
+        append((make_packet(
+            packet_id, packet_type, version, frame_number,
+            x / 64.0, y / 64.0, z / 64.0,
+            pan / 32768.0, tilt / 32768.0, roll / 32768.0,
+            zoom / 32768.0, focus / 32768.0
+        ), True))
+    return results
+
+# Field names shared by the struct layouts above and the bulk decoder
+_BASE_FIELDS = ('packet_id', 'packet_type', 'version', 'frame_number',
+                'x_pos', 'y_pos', 'z_pos', 'pan', 'tilt', 'roll')
+_LENS_FIELDS = ('zoom', 'focus')
+
+@dataclass
+class FreeDColumns:
+    """Columnar FreeD packet data (NumPy arrays, one entry per record)"""
+    frame_number: 'np.ndarray'
+    x_pos: 'np.ndarray'
+    y_pos: 'np.ndarray'
+    z_pos: 'np.ndarray'
+    pan: 'np.ndarray'
+    tilt: 'np.ndarray'
+    roll: 'np.ndarray'
+    zoom: 'np.ndarray'
+    focus: 'np.ndarray'
+    valid: 'np.ndarray'  # Boolean mask of records with a valid ID and type
+    
+    def __len__(self) -> int:
+        return len(self.valid)
+
+def freed_record_fields(record_size: int = 39, offset: int = 0) -> dict:
+    """
+    Field spec (names, formats, offsets) of one FreeD record on the wire,
+    suitable for np.dtype(). offset shifts every field, so the spec can be
+    embedded in a larger record layout.
+    record_size is 31 (no lens data) or 39 (with zoom and focus).
+    """
+    if record_size == LENS_PACKET_STRUCT.size:
+        names = _BASE_FIELDS + _LENS_FIELDS
+    elif record_size == PACKET_STRUCT.size:
+        names = _BASE_FIELDS
+    else:
+        raise ValueError(f'Unsupported FreeD record size: {record_size}')
+    formats = ['u1', 'u1', 'u1', '>u4'] + ['>i4'] * (len(names) - 4)
+    offsets = [offset, offset + 1, offset + 2] + [offset + 3 + 4 * i for i in range(len(names) - 3)]
+    return {'names': list(names), 'formats': formats, 'offsets': offsets}
+
+def freed_record_dtype(record_size: int = 39):
+    """NumPy structured dtype matching one FreeD record on the wire"""
+    import numpy as np
+    
+    return np.dtype({**freed_record_fields(record_size), 'itemsize': record_size})
+
+def decode_freed_records(records) -> FreeDColumns:
+    """
+    Scale a structured array with FreeD record fields into FreeDColumns.
+    Records without zoom/focus fields decode them as zero. Records that
+    fail validation keep their decoded values but are cleared in the
+    `valid` mask.
+    """
+    import numpy as np
+    
+    valid = (records['packet_id'] == 0x44) & (records['packet_type'] == 0x01)
+    if 'zoom' in records.dtype.names:
+        zoom = records['zoom'] / 32768.0
+        focus = records['focus'] / 32768.0
+    else:
+        zoom = np.zeros(len(records))
+        focus = np.zeros(len(records))
+    
+    return FreeDColumns(
+        frame_number=records['frame_number'].astype(np.uint32),
+        x_pos=records['x_pos'] / 64.0,
+        y_pos=records['y_pos'] / 64.0,
+        z_pos=records['z_pos'] / 64.0,
+        pan=records['pan'] / 32768.0,
+        tilt=records['tilt'] / 32768.0,
+        roll=records['roll'] / 32768.0,
+        zoom=zoom,
+        focus=focus,
+        valid=valid
+    )
+
+def parse_freed_buffer(buffer, record_size: int = 39) -> FreeDColumns:
+    """
+    Decode a contiguous buffer of fixed-size FreeD records in bulk.
+    The buffer is viewed in place as big-endian integers and scaled with
+    vectorized NumPy operations.
+    """
+    import numpy as np
+    
+    dtype = freed_record_dtype(record_size)
+    if memoryview(buffer).nbytes % record_size:
+        raise ValueError(f'Buffer length is not a multiple of the {record_size}-byte record size')
+    return decode_freed_records(np.frombuffer(buffer, dtype=dtype))
+
+def encode_freed_packet_into(buffer, offset: int, frame: int, x: float, y: float, z: float,
+                             pan: float, tilt: float, roll: float,
+                             zoom: float = 0.0, focus: float = 0.0, *,
+                             packet_id: int = 0x44, packet_type: int = 0x01,
+                             version: int = 0x02) -> None:
+    """
+    Encode one FreeD packet with lens data into a writable buffer at
+    `offset`, in place. Positions are scaled by 64 and angles, zoom and
+    focus by 32768, truncated toward zero; the frame number wraps at 2**32.
+    """
+    _pack_lens_into(buffer, offset, packet_id, packet_type, version, frame & 0xFFFFFFFF,
+                    int(x * 64), int(y * 64), int(z * 64),
+                    int(pan * 32768), int(tilt * 32768), int(roll * 32768),
+                    int(zoom * 32768), int(focus * 32768))
+
+def encode_freed_packet(frame: int, x: float, y: float, z: float,
+                        pan: float, tilt: float, roll: float,
+                        zoom: float = 0.0, focus: float = 0.0, **header) -> bytes:
+    """encode_freed_packet_into a new 39-byte packet"""
+    packet = bytearray(PACKET_SIZE)
+    encode_freed_packet_into(packet, 0, frame, x, y, z, pan, tilt, roll, zoom, focus, **header)
+    return bytes(packet)
+
+def encode_many(frame, x, y, z, pan, tilt, roll, zoom=0.0, focus=0.0, out=None):
+    """
+    Batch encode_freed_packet: encode equal-length arrays of poses (scalars
+    broadcast) into consecutive 39-byte packets in one vectorized step.
+    Writes into the writable buffer `out` when given (which must hold
+    exactly len(frame) packets) and returns it; otherwise returns bytes.
+    """
+    import numpy as np
+    
+    frame = np.asarray(frame)
+    dtype = freed_record_dtype(PACKET_SIZE)
+    if out is None:
+        records = np.empty(len(frame), dtype=dtype)
+    else:
+        records = np.frombuffer(out, dtype=dtype)
+        if len(records) != len(frame):
+            raise ValueError(f'Buffer holds {len(records)} packets, got {len(frame)}')
+    records['packet_id'] = 0x44  # 'D'
+    records['packet_type'] = 0x01
+    records['version'] = 0x02
+    records['frame_number'] = frame.astype(np.int64) & 0xFFFFFFFF
+    # Truncate toward zero, as int() does in encode_freed_packet_into
+    for name, values, scale in (('x_pos', x, 64), ('y_pos', y, 64), ('z_pos', z, 64),
+                                ('pan', pan, 32768), ('tilt', tilt, 32768), ('roll', roll, 32768),
+                                ('zoom', zoom, 32768), ('focus', focus, 32768)):
+        records[name] = np.trunc(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+    return records.tobytes() if out is None else out
+
+class RecvPool:
+    """
+    Preallocated receive buffers for draining a UDP socket in batches.
+    
+    Each datagram is read with recvfrom_into into its own bytearray slot
+    and handed out as a memoryview, so no bytes object is allocated per
+    datagram. Views are only valid until the next call to drain().
+    Each datagram is stamped with time.perf_counter_ns() as soon as it is
+    read, so work done on a batch does not skew inter-arrival times.
+    The socket must be in non-blocking mode.
+    """
+    
+    def __init__(self, slots: int = 256, slot_size: int = 4096):
+        self._views = [memoryview(bytearray(slot_size)) for _ in range(slots)]
+        self.datagrams = 0  # Datagrams received
+        self.syscalls = 0   # recvfrom_into calls, including the final empty one
+        self.wakeups = 0    # Calls to drain()
+    
+    def drain(self, sock: socket.socket) -> List[Tuple[memoryview, tuple, int]]:
+        """
+        Read every queued datagram, up to the number of slots.
+        Returns a list of (memoryview, address, arrival_ns) tuples.
+        """
+        batch = []
+        recvfrom_into = sock.recvfrom_into
+        clock = time.perf_counter_ns
+        self.wakeups += 1
+        for view in self._views:
+            self.syscalls += 1
+            try:
+                size, address = recvfrom_into(view)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # ICMP port unreachable reported on the socket (Windows)
+                continue
+            batch.append((view[:size], address, clock()))
+        self.datagrams += len(batch)
+        return batch
+    
+    def receive(self, sock: socket.socket, timeout: float = None) -> List[Tuple[memoryview, tuple, int]]:
+        """
+        Wait up to timeout seconds for the socket to become readable,
+        then drain it. Returns an empty list on timeout.
+        """
+        readable, _, _ = select.select([sock], [], [], timeout)
+        if not readable:
+            return []
+        return self.drain(sock)
+
+def parse_listen_address(value: str) -> Tuple[str, int]:
+    """Parse an 'ip:port' (or bare 'port') listen address"""
+    host, _, port = value.rpartition(':')
+    try:
+        return host or '0.0.0.0', int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid listen address: {value!r}')
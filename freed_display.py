@@ -0,0 +1,108 @@
+import sys
+import time
+
+# Console output modes shared by the validator and the network test runner
+DISPLAY_MODES = ('summary', 'packets', 'none')
+
+def percentiles(histogram) -> str:
+    """Compact p50/p99/p99.9/max of a nanosecond histogram, in milliseconds"""
+    if not histogram.count:
+        return '-'
+    return '/'.join(f'{value / 1e6:.2f}' for value in (
+        histogram.percentile(50), histogram.percentile(99),
+        histogram.percentile(99.9), histogram.max))
+
+class SummaryDisplay:
+    """
+    Refreshing per-source dashboard rendered at a fixed frame rate.
+    
+    `sources` maps a source address to a handler exposing packets, valid,
+    stream (a StreamTracker), jitter, intervals (a LatencyHistogram) and
+    last_packet (see freed_server.SourceHandler).
+    The dashboard only reads those counters, so the cost on the receive
+    path does not depend on the packet rate.
+    """
+    
+    def __init__(self, sources: dict, fps: float = 4.0, stream=None, title: str = 'FreeD Validator'):
+        self.sources = sources
+        self.interval = 1.0 / fps
+        self.stream = stream or sys.stdout
+        self.title = title
+        self._ansi = self.stream.isatty()
+        self._last_render = None
+        self._last_counts = {}
+    
+    def maybe_render(self) -> None:
+        """Render if at least one frame interval has passed since the last render"""
+        now = time.monotonic()
+        if self._last_render is None or now - self._last_render >= self.interval:
+            self.render(now)
+    
+    def render(self, now: float = None) -> None:
+        """Draw the dashboard"""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_render if self._last_render is not None else None
+        self._last_render = now
+        
+        lines = [
+            f'=== {self.title} === {len(self.sources)} source(s)',
+            f'{"Source":<22} {"Rate/s":>8} {"Valid%":>7} {"Frame":>10} {"Lost":>7} {"Loss%":>6} {"Dup":>5} {"OOO":>5} '
+            f'{"Jitter ms":>9} {"Interval p50/p99/p99.9/max ms":>30}  {"Position (mm)":<26} Rotation (deg)',
+        ]
+        for address, handler in list(self.sources.items()):
+            previous = self._last_counts.get(address, handler.packets)
+            self._last_counts[address] = handler.packets
+            rate = (handler.packets - previous) / elapsed if elapsed else 0.0
+            valid_pct = handler.valid / handler.packets * 100 if handler.packets else 0.0
+            stream = handler.stream
+            
+            packet = handler.last_packet
+            if packet is not None:
+                frame = str(packet.frame_number)
+                position = f'{packet.x_pos:8.1f} {packet.y_pos:8.1f} {packet.z_pos:8.1f}'
+                rotation = f'{packet.pan:7.2f} {packet.tilt:7.2f} {packet.roll:7.2f}'
+            else:
+                frame = position = rotation = '-'
+            lines.append(
+                f'{address[0] + ":" + str(address[1]):<22} {rate:8.1f} {valid_pct:7.1f} {frame:>10} '
+                f'{stream.lost:7d} {stream.loss_rate * 100:6.2f} {stream.duplicates:5d} {stream.out_of_order:5d} '
+                f'{handler.jitter / 1e6:9.3f} {percentiles(handler.intervals):>30}  {position:<26} {rotation}'
+            )
+        
+        text = '\n'.join(lines) + '\n'
+        if self._ansi:
+            text = '\x1b[H\x1b[J' + text  # Home cursor and clear the screen
+        else:
+            text = '\n' + text
+        self.stream.write(text)
+        self.stream.flush()
+
+class StatsReporter:
+    """
+    Periodic plain-text timing report, for runs without the summary display.
+    Prints inter-arrival and deviation percentiles for every source.
+    """
+    
+    def __init__(self, sources: dict, interval: float = 10.0, stream=None):
+        self.sources = sources
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self._last_render = None
+    
+    def maybe_render(self) -> None:
+        """Render if at least one interval has passed since the last report"""
+        now = time.monotonic()
+        if self._last_render is None:
+            self._last_render = now
+        elif now - self._last_render >= self.interval:
+            self.render(now)
+    
+    def render(self, now: float = None) -> None:
+        self._last_render = time.monotonic() if now is None else now
+        lines = []
+        for address, handler in list(self.sources.items()):
+            lines.append(f'{address[0]}:{address[1]} interval {handler.intervals.summary()} | '
+                         f'deviation {handler.deviations.summary()}')
+        if lines:
+            self.stream.write('\n' + '\n'.join(lines) + '\n')
+            self.stream.flush()
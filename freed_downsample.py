@@ -0,0 +1,93 @@
+import numpy as np
+
+# Downsampling methods for time series
+DOWNSAMPLE_METHODS = ('minmax', 'lttb')
+
+def minmax_indices(values, budget: int) -> np.ndarray:
+    """
+    Indices of at most `budget` points of a series that keep its shape:
+    the series is cut into budget // 2 equal buckets and the minimum and
+    maximum of each are kept, so no spike is lost at any zoom level that
+    fits the budget. NaN points are only kept for an all-NaN bucket.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    if count <= budget:
+        return np.arange(count)
+    buckets = max(1, budget // 2)
+    size = -(-count // buckets)
+    pad = buckets * size - count
+    missing = np.isnan(values)
+    low = np.pad(np.where(missing, np.inf, values), (0, pad), constant_values=np.inf)
+    high = np.pad(np.where(missing, -np.inf, values), (0, pad), constant_values=-np.inf)
+    starts = np.arange(buckets) * size
+    indices = np.concatenate((starts + low.reshape(buckets, size).argmin(axis=1),
+                              starts + high.reshape(buckets, size).argmax(axis=1)))
+    return np.unique(np.minimum(indices, count - 1))
+
+def lttb_indices(x, y, budget: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `budget` points of a finite
+    series (x ascending) that keep its visual shape. The first and last
+    points are always kept; from each bucket in between, the point forming
+    the largest triangle with the previously kept point and the mean of
+    the next bucket is kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(y)
+    if count <= budget or budget < 3:
+        return np.arange(count)
+    edges = np.linspace(1, count - 1, budget - 1).astype(np.int64)
+    edges = np.append(edges, count)
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(budget - 2):
+        start, stop, after = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        mean_x = x[stop:after].mean()
+        mean_y = y[stop:after].mean()
+        px, py = x[previous], y[previous]
+        area = np.abs((px - mean_x) * (y[start:stop] - py) - (px - x[start:stop]) * (mean_y - py))
+        previous = start + int(area.argmax()) if stop > start else previous
+        selected[bucket + 1] = previous
+    return np.unique(selected)
+
+def downsample_indices(x, y, budget: int, method: str = 'minmax') -> np.ndarray:
+    """Indices of at most `budget` points of a time series, by DOWNSAMPLE_METHODS name"""
+    if method == 'minmax':
+        return minmax_indices(y, budget)
+    if method == 'lttb':
+        return lttb_indices(x, y, budget)
+    raise ValueError(f'Unknown downsampling method: {method}')
+
+def decimate_points(points, budget: int) -> np.ndarray:
+    """
+    Density-aware decimation of an (N, 3) point trail to at most `budget`
+    points, returned as sorted indices.
+    
+    The bounding box is cut into a grid of cubic-ish cells and only the
+    first point in each occupied cell is kept, so a camera parked in one
+    spot collapses to a few points while every part of a sparse path
+    stays visible. The grid is coarsened until the occupied cells fit the
+    budget. Very long trails are first thinned evenly in time to 16 points
+    per budgeted point to bound the work.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    count = len(points)
+    if count <= budget:
+        return np.arange(count)
+    candidates = np.arange(0, count, max(1, count // (16 * budget)))
+    sample = points[candidates]
+    low = sample.min(axis=0)
+    span = sample.max(axis=0) - low
+    unit = (sample - low) / np.where(span > 0, span, 1.0)
+    resolution = 1024
+    while True:
+        cells = np.minimum((unit * resolution).astype(np.int64), resolution - 1)
+        keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+        _, first = np.unique(keys, return_index=True)
+        if len(first) <= budget or resolution == 1:
+            return candidates[np.sort(first)]
+        # Occupied cells of a trail scale roughly linearly with resolution
+        resolution = max(1, min(resolution - 1, int(resolution * budget / len(first))))
@@ -0,0 +1,160 @@
+import argparse
+import heapq
+import socket
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Sequence
+from freed_codec import PACKET_SIZE, freed_record_dtype
+from freed_pacing import Pacer
+
+# One replay/simulation destination. delay is in seconds; frame_offset is
+# added to every frame number sent to this target.
+Target = namedtuple('Target', ['address', 'delay', 'frame_offset'])
+
+def parse_target(value: str) -> Target:
+    """Parse 'ip:port[,delay=SECONDS][,frame_offset=N]'"""
+    address, *options = value.split(',')
+    host, _, port = address.rpartition(':')
+    delay, frame_offset = 0.0, 0
+    try:
+        port = int(port)
+        for option in options:
+            key, _, setting = option.partition('=')
+            if key == 'delay':
+                delay = float(setting)
+            elif key == 'frame_offset':
+                frame_offset = int(setting)
+            else:
+                raise ValueError(key)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid target: {value!r}')
+    if delay < 0:
+        raise argparse.ArgumentTypeError(f'negative delay in target: {value!r}')
+    return Target((host or '127.0.0.1', port), delay, frame_offset)
+
+def describe_target_options(target: Target) -> str:
+    """' (delay 4.0 ms, frame offset 2)' style suffix, empty for a plain target"""
+    options = []
+    if target.delay:
+        options.append(f'delay {target.delay * 1000:g} ms')
+    if target.frame_offset:
+        options.append(f'frame offset {target.frame_offset:+d}')
+    return f' ({", ".join(options)})' if options else ''
+
+def offset_frames(buffer: bytes, frame_offset: int) -> bytes:
+    """Copy of a buffer of encoded packets with frame_offset added to every frame number"""
+    import numpy as np
+    
+    records = np.frombuffer(buffer, dtype=freed_record_dtype(PACKET_SIZE)).copy()
+    records['frame_number'] = (records['frame_number'].astype(np.int64) + frame_offset) & 0xFFFFFFFF
+    return records.tobytes()
+
+class FanOut:
+    """
+    Sends encoded packets to several targets from one paced loop.
+    
+    Each chunk of packets is encoded once by the caller; targets with a
+    frame offset get one vectorized copy with patched frame numbers. The
+    sends of all targets are merged into one schedule (send time plus the
+    target's delay), and everything due at the same instant goes out in
+    one burst after a single wait. Each target gets its own socket, so
+    receivers see one source address per stream.
+    
+    Entries due at or after the last packet of a chunk are held back and
+    merged with the next chunk, so delays longer than a chunk and the
+    pacer's skip look-ahead both work across chunk boundaries; flush()
+    sends whatever is left.
+    
+    A single target without delay or frame offset skips the merge: its
+    packets are sent straight from the chunk, holding back only the last
+    one for the skip look-ahead, so one-packet chunks stay cheap.
+    """
+    
+    def __init__(self, targets: Sequence[Target], socket_factory=None):
+        self.targets = list(targets)
+        socket_factory = socket_factory or (lambda: socket.socket(socket.AF_INET, socket.SOCK_DGRAM))
+        self.sockets = [socket_factory() for _ in self.targets]
+        self.sent = 0        # Datagrams sent, over all targets
+        self._pending = []   # Held-back (send time, sequence, payload, sendto, address), sorted
+        self._sequence = 0   # Tie-breaker keeping equal send times in arrival order
+        self._direct = len(self.targets) == 1 and not self.targets[0].delay \
+            and not self.targets[0].frame_offset
+        self._held = None    # Direct path: held-back (send time, payload)
+    
+    def send_chunk(self, pacer: Pacer, buffer: bytes, send_times: List[float]) -> int:
+        """Queue a chunk of encoded packets and send everything due before its last one"""
+        if self._direct:
+            return self._send_direct(pacer, buffer, send_times)
+        entries = [self._pending]
+        for target, sock in zip(self.targets, self.sockets):
+            payload = memoryview(offset_frames(buffer, target.frame_offset)
+                                 if target.frame_offset else buffer)
+            address, delay, start, sendto = target.address, target.delay, self._sequence, sock.sendto
+            entries.append([(time + delay, start + index,
+                             payload[index * PACKET_SIZE:(index + 1) * PACKET_SIZE], sendto, address)
+                            for index, time in enumerate(send_times)])
+            self._sequence += len(send_times)
+        merged = list(heapq.merge(*entries, key=itemgetter(0, 1)))
+        
+        horizon = send_times[-1] if send_times else float('inf')
+        split = len(merged)
+        while split and merged[split - 1][0] >= horizon:
+            split -= 1
+        self._pending = merged[split:]
+        return self._send(pacer, merged[:split])
+    
+    def flush(self, pacer: Pacer) -> int:
+        """Send every held-back entry"""
+        if self._direct:
+            return self._send_direct(pacer, b'', [])
+        pending, self._pending = self._pending, []
+        return self._send(pacer, pending)
+    
+    def _send_direct(self, pacer: Pacer, buffer: bytes, send_times: List[float]) -> int:
+        if pacer.epoch is None:
+            pacer.start()
+        sendto, address = self.sockets[0].sendto, self.targets[0].address
+        view = memoryview(buffer)
+        held = self._held
+        sent = 0
+        for index, time in enumerate(send_times):
+            # Packets due at the same time go out together, as in _send
+            if held is not None and (time == held[0] or not pacer.should_skip(time)):
+                pacer.wait(held[0])
+                sendto(held[1], address)
+                sent += 1
+            held = (time, view[index * PACKET_SIZE:(index + 1) * PACKET_SIZE])
+        if not send_times and held is not None:
+            pacer.wait(held[0])
+            sendto(held[1], address)
+            sent += 1
+            held = None
+        self._held = held
+        self.sent += sent
+        return sent
+    
+    def _send(self, pacer: Pacer, entries: list) -> int:
+        if pacer.epoch is None:
+            pacer.start()
+        groups = [(time, [entry[2:] for entry in group])
+                  for time, group in groupby(entries, key=itemgetter(0))]
+        sent = 0
+        for index, (time, group) in enumerate(groups):
+            # The next send time, for the skip policy: next group or first held-back entry
+            if index + 1 < len(groups):
+                upcoming = groups[index + 1][0]
+            else:
+                upcoming = self._pending[0][0] if self._pending else None
+            if upcoming is not None and pacer.should_skip(upcoming):
+                continue
+            pacer.wait(time)
+            for payload, sendto, address in group:
+                sendto(payload, address)
+            sent += len(group)
+        self.sent += sent
+        return sent
+    
+    def close(self) -> None:
+        for sock in self.sockets:
+            sock.close()
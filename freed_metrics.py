@@ -0,0 +1,153 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Optional
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_METRICS_PORT = 9108
+
+# Interarrival quantiles published for every source
+QUANTILES = (0.5, 0.99, 0.999)
+
+def udp_receive_drops(ports: Iterable[int]) -> Dict[int, int]:
+    """
+    Kernel receive-queue drops per local UDP port, read from /proc/net/udp
+    and /proc/net/udp6. Returns an empty dict where those are unavailable.
+    """
+    ports = set(ports)
+    drops = {}
+    for path in ('/proc/net/udp', '/proc/net/udp6'):
+        try:
+            with open(path) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            port = int(fields[1].rsplit(':', 1)[1], 16)
+            if port in ports:
+                drops[port] = drops.get(port, 0) + int(fields[-1])
+    return drops
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _Family:
+    """Lines of one metric family in the Prometheus text format"""
+    
+    def __init__(self, lines: list, name: str, kind: str, help_text: str):
+        self.lines = lines
+        self.name = name
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+    
+    def add(self, value, suffix: str = '', **labels) -> None:
+        label_text = ','.join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+        self.lines.append(f'{self.name}{suffix}{{{label_text}}} {value}' if label_text
+                          else f'{self.name}{suffix} {value}')
+
+def render_metrics(sources: dict, writers: Optional[dict] = None,
+                   ports: Iterable[int] = ()) -> str:
+    """
+    Render the Prometheus text exposition of the validator state.
+    
+    `sources` maps source addresses to SourceHandlers, `writers` maps a
+    writer name to a BackgroundWriter and `ports` are the local UDP ports
+    whose kernel drop counters are reported. Everything is read from the
+    existing counters at scrape time.
+    """
+    lines = []
+    handlers = [(f'{address[0]}:{address[1]}', handler) for address, handler in list(sources.items())]
+    
+    def per_source(name, kind, help_text, value):
+        family = _Family(lines, name, kind, help_text)
+        for source, handler in handlers:
+            family.add(value(handler), source=source)
+    
+    per_source('freed_packets_total', 'counter', 'Datagrams received.',
+               lambda h: h.packets)
+    per_source('freed_valid_packets_total', 'counter', 'Datagrams that passed validation.',
+               lambda h: h.valid)
+    per_source('freed_invalid_packets_total', 'counter', 'Datagrams that failed validation.',
+               lambda h: h.invalid)
+    per_source('freed_frame_gaps_total', 'counter', 'Forward frame-number jumps that skipped frames.',
+               lambda h: h.stream.gaps)
+    per_source('freed_frames_lost', 'gauge', 'Skipped frames not (yet) received late.',
+               lambda h: h.stream.lost)
+    per_source('freed_duplicate_frames_total', 'counter', 'Frames received more than once.',
+               lambda h: h.stream.duplicates)
+    per_source('freed_out_of_order_frames_total', 'counter', 'Frames that arrived late.',
+               lambda h: h.stream.out_of_order)
+    per_source('freed_decode_seconds_total', 'counter', 'Time spent parsing datagrams.',
+               lambda h: h.decode_ns / 1e9)
+    per_source('freed_jitter_seconds', 'gauge', 'Smoothed interarrival jitter.',
+               lambda h: h.jitter / 1e9)
+    
+    family = _Family(lines, 'freed_interarrival_seconds', 'summary', 'Time between datagrams.')
+    for source, handler in handlers:
+        intervals = handler.intervals
+        for quantile in QUANTILES:
+            family.add(intervals.percentile(quantile * 100) / 1e9, source=source, quantile=quantile)
+        family.add(intervals.total / 1e9, '_sum', source=source)
+        family.add(intervals.count, '_count', source=source)
+    
+    drops = udp_receive_drops(ports)
+    if drops:
+        family = _Family(lines, 'freed_udp_receive_drops_total', 'counter',
+                         'Datagrams dropped by the kernel because the socket buffer was full.')
+        for port, count in sorted(drops.items()):
+            family.add(count, port=port)
+    
+    writers = {name: writer for name, writer in (writers or {}).items() if writer is not None}
+    if writers:
+        for name, kind, help_text, value in (
+                ('freed_writer_backlog', 'gauge', 'Entries queued for writing.', lambda w: w.backlog),
+                ('freed_writer_high_water', 'gauge', 'Largest backlog observed.', lambda w: w.high_water),
+                ('freed_writer_written_total', 'counter', 'Entries written.', lambda w: w.written),
+                ('freed_writer_dropped_total', 'counter', 'Entries dropped on a full queue.',
+                 lambda w: w.dropped)):
+            family = _Family(lines, name, kind, help_text)
+            for writer_name, writer in writers.items():
+                family.add(value(writer), writer=writer_name)
+    
+    return '\n'.join(lines) + '\n'
+
+class MetricsServer:
+    """
+    Serves `render()` as Prometheus metrics on GET /metrics from a daemon
+    thread. The receive path only updates plain counters; rendering (and
+    reading /proc) happens on the scrape thread when a request arrives.
+    """
+    
+    def __init__(self, render: Callable[[], str], port: int = DEFAULT_METRICS_PORT,
+                 host: str = '127.0.0.1'):
+        self.render = render
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?', 1)[0] != '/metrics':
+                    handler.send_error(404)
+                    return
+                body = self.render().encode()
+                handler.send_response(200)
+                handler.send_header('Content-Type', CONTENT_TYPE)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+            
+            def log_message(handler, *args):
+                pass  # Keep scrapes out of the console output
+        
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.address = self._httpd.server_address
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name='freed-metrics', daemon=True)
+    
+    def start(self) -> 'MetricsServer':
+        self._thread.start()
+        return self
+    
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,84 @@
+import time
+from typing import Iterable, Iterator
+from freed_stats import LatencyHistogram
+
+# What to do with packets whose send time has already passed
+PACING_POLICIES = ('catch-up', 'skip')
+
+class Pacer:
+    """
+    Drift-free send scheduler shared by the replayer and the simulator.
+    
+    Send times are offsets from a fixed epoch on the monotonic
+    perf_counter clock, so errors never accumulate. Each wait sleeps until
+    `spin` seconds before the deadline and busy-waits the rest, which
+    absorbs the scheduler's wake-up latency at the cost of CPU time in the
+    spin window. When running late, 'catch-up' sends the overdue packets
+    back to back, while 'skip' drops every packet whose successor is also
+    already due. The lateness of every send is recorded in `errors` (ns).
+    """
+    
+    def __init__(self, spin: float = 0.001, policy: str = 'catch-up',
+                 clock=time.perf_counter_ns, sleep=time.sleep):
+        if policy not in PACING_POLICIES:
+            raise ValueError(f'Unknown pacing policy: {policy}')
+        self.spin_ns = int(spin * 1e9)
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.epoch = None
+        self.sent = 0
+        self.skipped = 0
+        self.errors = LatencyHistogram()
+    
+    def start(self) -> None:
+        """Set the schedule epoch (offset 0) to now"""
+        self.epoch = self.clock()
+    
+    def wait(self, offset: float) -> int:
+        """Block until `offset` seconds after the epoch; returns the lateness in ns"""
+        clock = self.clock
+        deadline = self.epoch + int(offset * 1e9)
+        remaining = deadline - clock()
+        if remaining > self.spin_ns:
+            self.sleep((remaining - self.spin_ns) / 1e9)
+        while clock() < deadline:
+            pass
+        error = clock() - deadline
+        self.errors.record(error)
+        self.sent += 1
+        return error
+    
+    def should_skip(self, next_offset: float) -> bool:
+        """
+        Under the 'skip' policy, check whether the packet before
+        `next_offset` should be dropped because that offset is already due.
+        Counts the skip if so.
+        """
+        if self.policy != 'skip' or self.clock() < self.epoch + int(next_offset * 1e9):
+            return False
+        self.skipped += 1
+        return True
+    
+    def schedule(self, offsets: Iterable[float]) -> Iterator[int]:
+        """
+        Pace through a (possibly endless) sequence of send offsets in
+        seconds, yielding the index of each packet when it is due.
+        Starts the schedule if start() has not been called.
+        """
+        if self.epoch is None:
+            self.start()
+        offsets = iter(offsets)
+        upcoming = next(offsets, None)
+        index = 0
+        while upcoming is not None:
+            offset, upcoming = upcoming, next(offsets, None)
+            if upcoming is None or not self.should_skip(upcoming):
+                self.wait(offset)
+                yield index
+            index += 1
+    
+    def summary(self) -> str:
+        """One-line timing report"""
+        return (f'Timing error: {self.errors.summary()}, '
+                f'{self.sent} sent, {self.skipped} skipped ({self.policy})')
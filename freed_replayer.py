@@ -1,132 +1,221 @@
-import socket
-import time
+import os
+import queue
+import threading
+import numpy as np
 import pandas as pd
-import struct
 from argparse import ArgumentParser
 from datetime import datetime
-from typing import Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+from freed_capture import CaptureReader, is_capture_file
+from freed_codec import encode_freed_packet, encode_many
+from freed_fanout import FanOut, Target, describe_target_options, parse_target
+from freed_pacing import PACING_POLICIES, Pacer
 
 def create_freed_packet(frame: int, x: float, y: float, z: float,
                        pan: float, tilt: float, roll: float,
                        zoom: float = 0.0, focus: float = 0.0) -> bytes:
     """Create a FreeD protocol packet from given parameters"""
-    # Convert values to appropriate scales
-    x_int = int(x * 64)
-    y_int = int(y * 64)
-    z_int = int(z * 64)
-    pan_int = int(pan * 32768)
-    tilt_int = int(tilt * 32768)
-    roll_int = int(roll * 32768)
-    zoom_int = int(zoom * 32768)
-    focus_int = int(focus * 32768)
+    return encode_freed_packet(frame, x, y, z, pan, tilt, roll, zoom, focus)
+
+def iter_log(log_file: str, chunk_size: int = 10000) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """
+    Stream a CSV log or binary capture as DataFrames in the CSV log schema
+    of at most chunk_size rows, each paired with the fraction of the file
+    read so far. Memory use depends on chunk_size, not on the file size.
+    """
+    if is_capture_file(log_file):
+        with CaptureReader(log_file) as capture:
+            total = len(capture)
+            for start in range(0, total, chunk_size):
+                stop = min(start + chunk_size, total)
+                yield capture.to_dataframe(start, stop), stop / total
+        return
+    
+    size = os.path.getsize(log_file) or 1
+    with open(log_file, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_size):
+            # Convert timestamp to datetime if not already
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+            yield chunk, min(f.tell() / size, 1.0)
+
+def encode_replay(df: pd.DataFrame, origin=None) -> Tuple[bytes, np.ndarray]:
+    """
+    Encode every valid packet of a log (or log chunk) up front.
     
-    # Create packet
-    packet = bytearray()
-    packet.append(0x44)  # 'D'
-    packet.append(0x01)  # Type
-    packet.append(0x02)  # Version
+    Returns the packets as one contiguous buffer (PACKET_SIZE bytes each)
+    and their send offsets in seconds relative to `origin`, by default
+    the first entry of `df`.
+    """
+    if origin is None:
+        origin = df['timestamp'].iloc[0]
+    offsets = (df['timestamp'] - origin).dt.total_seconds().to_numpy()
+    valid = (df['valid'] == True).to_numpy()
+    packets = df[valid]
+    buffer = encode_many(
+        packets['frame'].to_numpy(), packets['x_pos'], packets['y_pos'], packets['z_pos'],
+        packets['pan'], packets['tilt'], packets['roll'], packets['zoom'], packets['focus'])
+    return buffer, offsets[valid]
+
+def encode_log_chunks(log_file: str, chunk_size: int = 10000,
+                      speed_factor: float = 1.0) -> Iterator[Tuple[bytes, list, float]]:
+    """
+    Stream a log as encoded chunks: (packet buffer, send times in seconds
+    from the start of playback, fraction of the file read).
+    """
+    origin = None
+    for df, progress in iter_log(log_file, chunk_size):
+        if df.empty:
+            continue
+        if origin is None:
+            origin = df['timestamp'].iloc[0]
+        buffer, offsets = encode_replay(df, origin)
+        if len(offsets):
+            yield buffer, (offsets / speed_factor).tolist(), progress
+
+def prefetch(items: Iterator, depth: int = 2) -> Iterator:
+    """
+    Iterate `items` on a reader thread, at most `depth` items ahead of the
+    consumer, so producing the next item (file I/O, parsing, encoding)
+    never runs on the consumer's schedule. An exception raised by the
+    producer is re-raised to the consumer; closing the returned generator
+    stops the reader.
+    """
+    ready = queue.Queue(depth)
+    stop = threading.Event()
+    end = object()
     
-    # Pack data in big-endian format
-    packet.extend(struct.pack('>I', frame))  # Frame number
-    packet.extend(struct.pack('>i', x_int))  # X position
-    packet.extend(struct.pack('>i', y_int))  # Y position
-    packet.extend(struct.pack('>i', z_int))  # Z position
-    packet.extend(struct.pack('>i', pan_int))  # Pan
-    packet.extend(struct.pack('>i', tilt_int))  # Tilt
-    packet.extend(struct.pack('>i', roll_int))  # Roll
-    packet.extend(struct.pack('>i', zoom_int))  # Zoom
-    packet.extend(struct.pack('>i', focus_int))  # Focus
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
     
-    return bytes(packet)
+    def run():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+    
+    thread = threading.Thread(target=run, name='freed-reader', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = ready.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
 
 def replay_log(log_file: str, target_ip: str, target_port: int,
-               speed_factor: float = 1.0, loop: bool = False) -> None:
-    """Replay FreeD packets from a log file"""
-    print(f"Loading log file: {log_file}")
-    df = pd.read_csv(log_file)
+               speed_factor: float = 1.0, loop: bool = False,
+               spin: float = 0.001, policy: str = 'catch-up',
+               chunk_size: int = 10000, targets: Optional[List[Target]] = None) -> None:
+    """
+    Replay FreeD packets from a log file, paced by a Pacer.
     
-    # Convert timestamp to datetime if not already
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    The log is streamed in chunks of chunk_size rows, each encoded in one
+    vectorized step on a reader thread while the previous one is sent, so
+    playback starts once the first chunk is encoded and memory stays flat
+    for any file size. A log that fits in a single chunk is encoded once
+    and reused by every loop pass.
+    With `targets`, every packet is sent to each of them (with their
+    delays and frame offsets) instead of target_ip:target_port.
+    """
+    print(f"Streaming log file: {log_file}")
     
-    # Create UDP socket
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    print(f"Sending packets to {target_ip}:{target_port}")
+    targets = targets or [Target((target_ip, target_port), 0.0, 0)]
+    fanout = FanOut(targets)
+    for target in targets:
+        print(f"Sending packets to {target.address[0]}:{target.address[1]}"
+              f"{describe_target_options(target)}")
+    pacer = Pacer(spin, policy)
+    cached = None
     
     try:
         while True:
-            start_time = time.time()
-            first_packet_time = df['timestamp'].iloc[0]
-            
-            # Filter only valid packets
-            valid_packets = df[df['valid'] == True].copy()
-            if valid_packets.empty:
-                print("No valid packets found in log file!")
-                return
-            
-            packet_count = 0
-            print(f"\nReplaying {len(valid_packets)} packets{' (loop enabled)' if loop else ''}")
+            print(f"\nReplaying{' (loop enabled)' if loop else ''}")
             print(f"Playback speed: {speed_factor}x")
             print("Press Ctrl+C to stop...")
             
-            for _, row in valid_packets.iterrows():
-                # Calculate packet timing
-                packet_timestamp = row['timestamp']
-                relative_time = (packet_timestamp - first_packet_time).total_seconds()
-                target_time = start_time + (relative_time / speed_factor)
-                
-                # Wait until it's time to send the packet
-                current_time = time.time()
-                if current_time < target_time:
-                    time.sleep(target_time - current_time)
-                
-                # Create and send packet
-                packet = create_freed_packet(
-                    frame=int(row['frame']),
-                    x=float(row['x_pos']),
-                    y=float(row['y_pos']),
-                    z=float(row['z_pos']),
-                    pan=float(row['pan']),
-                    tilt=float(row['tilt']),
-                    roll=float(row['roll']),
-                    zoom=float(row['zoom']),
-                    focus=float(row['focus'])
-                )
-                
-                sock.sendto(packet, (target_ip, target_port))
-                packet_count += 1
-                
-                # Update progress
-                progress = (packet_count / len(valid_packets)) * 100
-                print(f"\rProgress: {progress:.1f}% ({packet_count}/{len(valid_packets)} packets)", end="")
+            packet_count = 0
+            chunks = []
+            last_progress = 0.0
+            pending = iter(cached) if cached else prefetch(
+                encode_log_chunks(log_file, chunk_size, speed_factor))
+            try:
+                # FanOut starts the schedule once the first chunk is encoded and
+                # ready to send, so playback never begins already behind
+                pacer.epoch = None
+                for buffer, send_times, progress in pending:
+                    if len(chunks) < 2:
+                        chunks.append((buffer, send_times, progress))
+                    packet_count += fanout.send_chunk(pacer, buffer, send_times)
+                    
+                    # Update progress every 1% of the file
+                    if progress - last_progress >= 0.01 or progress == 1.0:
+                        last_progress = progress
+                        print(f"\rProgress: {progress * 100:.1f}% ({packet_count} packets)", end="")
+            finally:
+                if not cached:
+                    pending.close()
             
+            packet_count += fanout.flush(pacer)
+            if not packet_count:
+                print("No valid packets found in log file!")
+                return
             print("\nReplay complete!")
             
             if not loop:
                 break
+            if len(chunks) == 1:
+                cached = chunks
             
             print("\nRestarting replay...")
     
     except KeyboardInterrupt:
         print("\nPlayback stopped by user")
     finally:
-        sock.close()
+        fanout.close()
+        print(pacer.summary())
 
-def main():
+def main(argv=None):
     parser = ArgumentParser(description='Replay FreeD packets from a log file')
     parser.add_argument('log_file', help='Path to the FreeD packet log CSV file')
     parser.add_argument('--ip', default='127.0.0.1',
                       help='Target IP address (default: 127.0.0.1)')
     parser.add_argument('--port', type=int, default=6000,
                       help='Target port number (default: 6000)')
+    parser.add_argument('--target', type=parse_target, action='append', default=[],
+                      metavar='IP:PORT[,delay=S][,frame_offset=N]',
+                      help='Send to this destination instead of --ip/--port '
+                           '(repeatable; each packet is encoded once for all targets)')
     parser.add_argument('--speed', type=float, default=1.0,
                       help='Playback speed factor (default: 1.0)')
     parser.add_argument('--loop', action='store_true',
                       help='Loop playback continuously')
+    parser.add_argument('--spin', type=float, default=0.001,
+                      help='Busy-wait this many seconds before each send time '
+                           'instead of sleeping (default: 0.001)')
+    parser.add_argument('--late', choices=PACING_POLICIES, default='catch-up',
+                      help='When behind schedule, send overdue packets back to back '
+                           '(catch-up) or drop them (skip) (default: catch-up)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                      help='Log rows read and encoded at a time (default: 10000)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     try:
-        replay_log(args.log_file, args.ip, args.port, args.speed, args.loop)
+        replay_log(args.log_file, args.ip, args.port, args.speed, args.loop,
+                   args.spin, args.late, args.chunk_size, args.target)
     except Exception as e:
         print(f"Error replaying log file: {e}")
         return 1
@@ -0,0 +1,341 @@
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+from functools import partial
+from typing import List, Tuple
+from freed_codec import FreeDPacket, RecvPool, parse_freed_packet, parse_listen_address
+from freed_display import DISPLAY_MODES, StatsReporter, SummaryDisplay
+from freed_metrics import MetricsServer, render_metrics
+from freed_stats import LatencyHistogram, StreamTracker
+
+class SourceHandler:
+    """Stream state and console output for one source address"""
+    
+    def __init__(self, address: tuple, verbose: bool = True, nominal_rate: float = None):
+        self.address = address
+        self.verbose = verbose
+        self.packets = 0
+        self.valid = 0
+        self.invalid = 0
+        self.last_packet = None
+        self.stream = StreamTracker()  # Frame continuity: gaps, duplicates, reordering
+        self.decode_ns = 0             # Parse time, added by the receive loop
+        # Timing, all in nanoseconds from time.perf_counter_ns()
+        self.nominal_interval = 1e9 / nominal_rate if nominal_rate else None
+        self.last_arrival = None
+        self.mean_interval = 0.0       # Smoothed inter-arrival time
+        self.jitter = 0.0              # Smoothed deviation from mean_interval
+        self.intervals = LatencyHistogram()   # Inter-arrival times
+        self.deviations = LatencyHistogram()  # |interval - nominal interval|
+    
+    def report(self) -> str:
+        """Multi-line end-of-run summary for this source"""
+        lines = [f'{self.address[0]}:{self.address[1]}: {self.packets} packets, '
+                 f'{self.valid} valid, {self.invalid} invalid',
+                 f'  Stream: {self.stream.summary()}',
+                 f'  Inter-arrival: {self.intervals.summary()}',
+                 f'  Deviation from {self._nominal_label()}: {self.deviations.summary()}']
+        for anomaly in self.stream.anomalies:
+            detail = f' ({anomaly.count} missing)' if anomaly.kind == 'gap' else ''
+            lines.append(f'  {anomaly.kind}: frame {anomaly.frame}, expected {anomaly.expected}{detail}')
+        return '\n'.join(lines)
+    
+    def _nominal_label(self) -> str:
+        if self.nominal_interval:
+            return f'nominal {1e9 / self.nominal_interval:g} Hz'
+        return 'mean rate'
+    
+    def handle(self, data, packet: FreeDPacket, is_valid: bool, arrival_ns: int = None) -> None:
+        """
+        Record one parsed datagram from this source. arrival_ns is its
+        receive time (see RecvPool.drain), by default now.
+        """
+        self.packets += 1
+        now = time.perf_counter_ns() if arrival_ns is None else arrival_ns
+        if self.last_arrival is not None:
+            # Exponential smoothing with gain 1/16, as for RTP jitter (RFC 3550)
+            interval = now - self.last_arrival
+            self.mean_interval += (interval - self.mean_interval) / 16
+            self.jitter += (abs(interval - self.mean_interval) - self.jitter) / 16
+            self.intervals.record(interval)
+            self.deviations.record(int(abs(interval - (self.nominal_interval or self.mean_interval))))
+        self.last_arrival = now
+        
+        if is_valid:
+            self.valid += 1
+            self.stream.update(packet.frame_number, now)
+            self.last_packet = packet
+            if not self.verbose:
+                return
+            print(f'\nReceived valid FreeD packet from {self.address}:')
+            print(f'Frame: {packet.frame_number}')
+            print(f'Position (mm): X={packet.x_pos:.2f}, Y={packet.y_pos:.2f}, Z={packet.z_pos:.2f}')
+            print(f'Rotation (deg): Pan={packet.pan:.2f}, Tilt={packet.tilt:.2f}, Roll={packet.roll:.2f}')
+            if packet.zoom or packet.focus:
+                print(f'Lens: Zoom={packet.zoom:.2f}, Focus={packet.focus:.2f}')
+        else:
+            self.invalid += 1
+            if not self.verbose:
+                return
+            print(f'\nReceived invalid packet from {self.address}')
+            print(f'Raw data: {data.hex()}')
+
+class FreeDServerProtocol(asyncio.DatagramProtocol):
+    """Validates incoming datagrams and dispatches them to per-source handlers"""
+    
+    def __init__(self, server: 'FreeDServer'):
+        self.server = server
+    
+    def datagram_received(self, data, addr, arrival_ns: int = None) -> None:
+        start = time.perf_counter_ns()
+        if arrival_ns is None:
+            arrival_ns = start
+        handler = self.server.sources.get(addr)
+        if handler is None:
+            handler = self.server.add_source(addr)
+        packet, is_valid = parse_freed_packet(data)
+        handler.decode_ns += time.perf_counter_ns() - start
+        handler.handle(data, packet, is_valid, arrival_ns)
+    
+    def error_received(self, exc: Exception) -> None:
+        print(f'\nSocket error: {exc}')
+
+class FreeDServer:
+    """
+    asyncio UDP server validating FreeD packets on one or more addresses.
+    
+    All listening sockets share one event loop and one table of source
+    handlers keyed by source address. With batch=True (the default) each
+    socket is drained through a RecvPool on every wakeup; event loops that
+    do not support add_reader fall back to a regular datagram endpoint.
+    With reuse_port=True the sockets are bound with SO_REUSEPORT so that
+    several processes can share the same port.
+    """
+    
+    def __init__(self, addresses: List[Tuple[str, int]], batch: bool = True,
+                 handler_factory=None, verbose: bool = True,
+                 reuse_port: bool = False):
+        self.addresses = addresses
+        self.batch = batch
+        self.handler_factory = handler_factory
+        self.verbose = verbose
+        self.reuse_port = reuse_port
+        self.sources = {}
+        self.bound_addresses = []
+        self._loop = None
+        self._sockets = []
+        self._transports = []
+        self._pool = RecvPool()
+    
+    def add_source(self, addr: tuple) -> SourceHandler:
+        """Create the stream-state handler for a newly seen source address"""
+        if self.handler_factory is not None:
+            handler = self.handler_factory(addr)
+        else:
+            handler = SourceHandler(addr, verbose=self.verbose)
+        self.sources[addr] = handler
+        return handler
+    
+    def totals(self) -> Tuple[int, int, int]:
+        """Return (packets, valid, invalid) summed over all sources"""
+        packets = valid = invalid = 0
+        for handler in self.sources.values():
+            packets += handler.packets
+            valid += handler.valid
+            invalid += handler.invalid
+        return packets, valid, invalid
+    
+    def _read_ready(self, sock: socket.socket, protocol: FreeDServerProtocol) -> None:
+        # Drain everything queued before doing any per-packet work
+        for data, addr, arrival_ns in self._pool.drain(sock):
+            protocol.datagram_received(data, addr, arrival_ns)
+    
+    async def start(self) -> None:
+        """Bind every listening address and start receiving"""
+        loop = self._loop = asyncio.get_running_loop()
+        for address in self.addresses:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(address)
+            sock.setblocking(False)
+            self.bound_addresses.append(sock.getsockname())
+            protocol = FreeDServerProtocol(self)
+            if self.verbose:
+                print(f'Starting UDP server on {sock.getsockname()}')
+            
+            if self.batch:
+                try:
+                    loop.add_reader(sock.fileno(), self._read_ready, sock, protocol)
+                    self._sockets.append(sock)
+                    continue
+                except NotImplementedError:
+                    pass  # e.g. Windows proactor loop
+            transport, _ = await loop.create_datagram_endpoint(lambda: protocol, sock=sock)
+            self._transports.append(transport)
+    
+    def close(self) -> None:
+        """Stop receiving and close all sockets"""
+        for sock in self._sockets:
+            self._loop.remove_reader(sock.fileno())
+            sock.close()
+        for transport in self._transports:
+            transport.close()
+        self._sockets = []
+        self._transports = []
+    
+    async def serve_forever(self, display=None) -> None:
+        """Start the server and run until cancelled, refreshing display if given"""
+        await self.start()
+        try:
+            if display is None:
+                await asyncio.get_running_loop().create_future()
+            while True:
+                display.render()
+                await asyncio.sleep(display.interval)
+        finally:
+            self.close()
+
+# Counters published by each worker process: packets, valid, invalid
+WORKER_COUNTERS = 3
+
+def _run_worker(addresses: List[Tuple[str, int]], counters, slot: int,
+                publish_interval: float) -> None:
+    """Worker process body: serve quietly and publish totals to shared memory"""
+    server = FreeDServer(addresses, verbose=False, reuse_port=True)
+    base = slot * WORKER_COUNTERS
+    
+    def publish():
+        counters[base:base + WORKER_COUNTERS] = server.totals()
+    
+    async def run():
+        await server.start()
+        try:
+            while True:
+                await asyncio.sleep(publish_interval)
+                publish()
+        finally:
+            server.close()
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publish()
+
+def run_workers(addresses: List[Tuple[str, int]], workers: int,
+                report_interval: float = 1.0) -> Tuple[int, int, int]:
+    """
+    Run the validator in several processes sharing each port via SO_REUSEPORT.
+    
+    The kernel spreads source addresses across the workers. Each worker
+    keeps its own counters and periodically copies them into a shared
+    array, which the parent sums to print merged totals and the packet
+    rate. Returns the final (packets, valid, invalid) totals.
+    """
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise RuntimeError('SO_REUSEPORT is not supported on this platform')
+    
+    counters = multiprocessing.Array('Q', workers * WORKER_COUNTERS, lock=False)
+    processes = [
+        multiprocessing.Process(target=_run_worker,
+                                args=(addresses, counters, slot, report_interval / 2),
+                                daemon=True)
+        for slot in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f'Started {workers} workers on {", ".join(f"{ip}:{port}" for ip, port in addresses)}')
+    
+    def merged():
+        return tuple(sum(counters[i::WORKER_COUNTERS]) for i in range(WORKER_COUNTERS))
+    
+    last_packets = 0
+    last_time = time.monotonic()
+    try:
+        while any(process.is_alive() for process in processes):
+            time.sleep(report_interval)
+            packets, valid, invalid = merged()
+            now = time.monotonic()
+            rate = (packets - last_packets) / (now - last_time)
+            last_packets, last_time = packets, now
+            print(f'\rPackets: {packets} (valid {valid}, invalid {invalid}) | '
+                  f'Rate: {rate:.1f} packets/sec', end='')
+    except KeyboardInterrupt:
+        print('\nShutting down...')
+    finally:
+        for process in processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+    
+    packets, valid, invalid = merged()
+    print(f'Total: {packets} packets, {valid} valid, {invalid} invalid')
+    return packets, valid, invalid
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate FreeD packets received over UDP')
+    parser.add_argument('--ip', default='0.0.0.0',
+                      help='IP address to listen on (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, nargs='+', default=[6000],
+                      help='Port number(s) to listen on (default: 6000)')
+    parser.add_argument('--listen', type=parse_listen_address, action='append', default=[],
+                      metavar='IP:PORT',
+                      help='Additional address to listen on (repeatable)')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Number of worker processes sharing the ports via '
+                           'SO_REUSEPORT (default: 1)')
+    parser.add_argument('--display', choices=DISPLAY_MODES, default='summary',
+                      help='Console output: refreshing per-source summary, every '
+                           'packet, or nothing (default: summary)')
+    parser.add_argument('--refresh', type=float, default=4.0,
+                      help='Summary refresh rate in Hz (default: 4)')
+    parser.add_argument('--rate', type=float,
+                      help='Nominal packet rate in Hz for timing deviation '
+                           '(default: each source\'s mean rate)')
+    parser.add_argument('--stats-interval', type=float, default=0.0,
+                      help='Print timing percentiles every N seconds when not '
+                           'using the summary display (default: 0 = off)')
+    parser.add_argument('--metrics-port', type=int,
+                      help='Serve Prometheus metrics on this TCP port, e.g. 9108 '
+                           '(single process only; default: off)')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                      help='Address for the metrics endpoint (default: 127.0.0.1)')
+    
+    args = parser.parse_args(argv)
+    addresses = [(args.ip, port) for port in args.port] + args.listen
+    if args.workers > 1:
+        if args.metrics_port:
+            parser.error('--metrics-port is not supported with --workers')
+        run_workers(addresses, args.workers)
+        return
+    
+    server = FreeDServer(addresses, handler_factory=partial(
+        SourceHandler, verbose=args.display == 'packets', nominal_rate=args.rate))
+    display = None
+    if args.display == 'summary':
+        display = SummaryDisplay(server.sources, fps=args.refresh)
+    elif args.stats_interval > 0:
+        display = StatsReporter(server.sources, args.stats_interval)
+    metrics = None
+    if args.metrics_port:
+        metrics = MetricsServer(
+            lambda: render_metrics(server.sources, ports=[port for _, port in server.bound_addresses]),
+            args.metrics_port, args.metrics_host).start()
+    
+    try:
+        asyncio.run(server.serve_forever(display))
+    except KeyboardInterrupt:
+        print('\nShutting down...')
+    finally:
+        if metrics:
+            metrics.close()
+    
+    for handler in server.sources.values():
+        print(handler.report())
+
+if __name__ == '__main__':
+    main()
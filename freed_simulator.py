@@ -1,9 +1,16 @@
+import heapq
 import socket
+import struct
 import time
 import math
 import argparse
+import itertools
+from collections import namedtuple
 from datetime import datetime
-from freed_replayer import create_freed_packet
+from typing import List, Optional
+from freed_codec import PACKET_SIZE, encode_freed_packet, encode_freed_packet_into, parse_listen_address
+from freed_fanout import FanOut, Target, describe_target_options, parse_target
+from freed_pacing import PACING_POLICIES, Pacer
 
 def generate_circle_pattern(radius: float, height: float, period: float, 
                           current_time: float) -> tuple:
@@ -50,77 +57,365 @@ def generate_oscillation(amplitude: float, height: float, period: float,
     
     return x, y, z, pan, tilt, roll
 
+# Pattern parameters
+PATTERN_SIZE = 1000.0    # mm
+PATTERN_HEIGHT = 2000.0  # mm
+PATTERN_PERIOD = 10.0    # seconds for one complete pattern
+
+PATTERNS = {
+    'circle': lambda t: generate_circle_pattern(PATTERN_SIZE, PATTERN_HEIGHT, PATTERN_PERIOD, t),
+    'figure8': lambda t: generate_figure_eight(PATTERN_SIZE, PATTERN_HEIGHT, PATTERN_PERIOD, t),
+    'oscillate': lambda t: generate_oscillation(PATTERN_SIZE, PATTERN_HEIGHT, PATTERN_PERIOD, t)
+}
+
+# Frame number field inside an encoded packet
+FRAME_STRUCT = struct.Struct('>I')
+FRAME_OFFSET = 3
+
+class PatternTable:
+    """
+    One period of a pattern, encoded up front for a fixed rate.
+    
+    Slot i holds the packet for pattern time i / rate (plus the phase).
+    packet(frame) only writes the frame number into the frame's slot and
+    returns a view of it, so sending costs no trig and no encoding. The
+    view is reused one period later; copy it if it must outlive that.
+    When PATTERN_PERIOD * rate is not a whole number the table is rounded
+    to whole frames and the motion jumps slightly at each wrap.
+    """
+    
+    def __init__(self, pattern: str, rate: float, phase: float = 0.0):
+        self.length = max(1, round(PATTERN_PERIOD * rate))
+        function = PATTERNS[pattern]
+        self.poses = [function(i / rate + phase * PATTERN_PERIOD) for i in range(self.length)]
+        self.buffer = bytearray(self.length * PACKET_SIZE)
+        for index, pose in enumerate(self.poses):
+            encode_freed_packet_into(self.buffer, index * PACKET_SIZE, 0, *pose, zoom=1.0, focus=0.5)
+        self._view = memoryview(self.buffer)
+    
+    def pose(self, frame: int) -> tuple:
+        """(x, y, z, pan, tilt, roll) of a frame"""
+        return self.poses[frame % self.length]
+    
+    def packet(self, frame: int) -> memoryview:
+        """Encoded packet of a frame, patched in place"""
+        start = (frame % self.length) * PACKET_SIZE
+        FRAME_STRUCT.pack_into(self.buffer, start + FRAME_OFFSET, frame & 0xFFFFFFFF)
+        return self._view[start:start + PACKET_SIZE]
+
 def simulate_freed_data(pattern: str, target_ip: str, target_port: int, 
-                       duration: float = 0.0, packet_rate: int = 30):
-    """Simulate FreeD camera movement patterns"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    frame = 0
-    period = 10.0  # seconds for one complete pattern
-    start_time = time.time()
-    
-    # Pattern parameters
-    size = 1000.0  # mm
-    height = 2000.0  # mm
-    
-    pattern_funcs = {
-        'circle': lambda t: generate_circle_pattern(size, height, period, t),
-        'figure8': lambda t: generate_figure_eight(size, height, period, t),
-        'oscillate': lambda t: generate_oscillation(size, height, period, t)
-    }
+                       duration: float = 0.0, packet_rate: int = 30,
+                       spin: float = 0.001, policy: str = 'catch-up',
+                       targets: Optional[List[Target]] = None, precompute: bool = False):
+    """Simulate FreeD camera movement patterns, optionally from a PatternTable"""
+    targets = targets or [Target((target_ip, target_port), 0.0, 0)]
+    fanout = FanOut(targets)
+    pacer = Pacer(spin, policy)
+    pattern_funcs = PATTERNS
     
     if pattern not in pattern_funcs:
         print(f"Invalid pattern. Choose from: {', '.join(pattern_funcs.keys())}")
         return
     
     print(f"Simulating {pattern} pattern at {packet_rate} Hz")
-    print(f"Sending to {target_ip}:{target_port}")
+    table = PatternTable(pattern, packet_rate) if precompute else None
+    if table:
+        print(f"Precomputed {table.length} packets")
+    for target in targets:
+        print(f"Sending to {target.address[0]}:{target.address[1]}{describe_target_options(target)}")
     print("Press Ctrl+C to stop...")
     
+    # Frame n is due n / packet_rate seconds after the start. Each frame is
+    # encoded once and handed to the fan-out, which sends it to every target.
+    frames = range(math.ceil(duration * packet_rate)) if duration > 0 else itertools.count()
+    start_time = time.perf_counter()
+    pacer.start()
     try:
-        while True:
-            current_time = time.time()
-            elapsed = current_time - start_time
-            
-            if duration > 0 and elapsed >= duration:
-                break
+        for frame in frames:
+            if table:
+                # The fan-out may hold the packet past the next frame, so copy the slot
+                packet = bytes(table.packet(frame))
+                x, y, z, pan, tilt, roll = table.pose(frame)
+            else:
+                # Generate position and rotation at the frame's scheduled time
+                x, y, z, pan, tilt, roll = pattern_funcs[pattern](frame / packet_rate)
+                
+                # Create and send packet
+                packet = encode_freed_packet(
+                    frame=frame,
+                    x=x, y=y, z=z,
+                    pan=pan, tilt=tilt, roll=roll,
+                    zoom=1.0, focus=0.5
+                )
             
-            # Generate position and rotation based on pattern
-            x, y, z, pan, tilt, roll = pattern_funcs[pattern](elapsed)
-            
-            # Create and send packet
-            packet = create_freed_packet(
-                frame=frame,
-                x=x, y=y, z=z,
-                pan=pan, tilt=tilt, roll=roll,
-                zoom=1.0, focus=0.5
-            )
-            
-            sock.sendto(packet, (target_ip, target_port))
+            fanout.send_chunk(pacer, packet, [frame / packet_rate])
             
             # Status update every second
             if frame % packet_rate == 0:
                 print(f"\rFrame: {frame}, "
                       f"Pos: ({x:.1f}, {y:.1f}, {z:.1f}), "
                       f"Rot: ({pan:.1f}, {tilt:.1f}, {roll:.1f})", end="")
+        
+        fanout.flush(pacer)
+    
+    except KeyboardInterrupt:
+        print("\nSimulation stopped by user")
+    finally:
+        fanout.close()
+    
+    elapsed = time.perf_counter() - start_time
+    print("\nSimulation complete!")
+    print(f"Sent {fanout.sent} packets to {len(targets)} target(s) over {elapsed:.1f} seconds")
+    if elapsed > 0:
+        print(f"Average rate: {fanout.sent/len(targets)/elapsed:.1f} packets/second per target")
+    print(pacer.summary())
+
+# One virtual camera of the multi-camera load generator. phase is the
+# starting point in the pattern, as a fraction of its period.
+CameraSpec = namedtuple('CameraSpec', ['pattern', 'rate', 'phase'])
+
+def parse_camera(value: str) -> CameraSpec:
+    """Parse 'pattern[:rate[:phase]]'; rate 0 means the --rate default"""
+    pattern, *settings = value.split(':')
+    try:
+        if pattern not in PATTERNS or len(settings) > 2:
+            raise ValueError(pattern)
+        rate = float(settings[0]) if settings else 0.0
+        phase = float(settings[1]) if len(settings) > 1 else 0.0
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid camera: {value!r}')
+    return CameraSpec(pattern, rate, phase)
+
+class VirtualCamera:
+    """Per-camera state of the multi-camera load generator"""
+    
+    __slots__ = ('spec', 'sock', 'pattern', 'table', 'packet', 'frame', 'sent', 'skipped')
+    
+    def __init__(self, spec: CameraSpec, sock: socket.socket, table: PatternTable = None):
+        self.spec = spec
+        self.sock = sock
+        self.pattern = PATTERNS[spec.pattern]
+        self.table = table
+        self.packet = bytearray(PACKET_SIZE)  # Reused by every send without a table
+        self.frame = 0
+        self.sent = 0
+        self.skipped = 0
+
+def simulate_cameras(cameras: List[CameraSpec], target_ip: str, target_port: int,
+                     duration: float = 0.0, spin: float = 0.001, policy: str = 'catch-up',
+                     source_port: int = 0, precompute: bool = False) -> List[VirtualCamera]:
+    """
+    Drive several virtual cameras from one paced loop.
+    
+    Each camera sends its own pattern, offset by its phase, at its own
+    rate from its own socket (bound to source_port + index when
+    source_port is set). The cameras' send times are merged through a
+    heap, and the first frames are staggered across one frame interval
+    so cameras at the same rate do not all fire at once. Under the 'skip'
+    policy a camera drops a frame when its own next frame is already due.
+    With precompute, cameras send from PatternTables (shared between
+    cameras with the same pattern, rate and phase).
+    Returns the cameras, with their sent and skipped counts.
+    """
+    target = (target_ip, target_port)
+    pacer = Pacer(spin, policy)
+    tables = {}
+    states = []
+    for index, spec in enumerate(cameras):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if source_port:
+            sock.bind(('0.0.0.0', source_port + index))
+        table = None
+        if precompute:
+            table = tables.get(spec)
+            if table is None:
+                table = tables[spec] = PatternTable(*spec)
+        states.append(VirtualCamera(spec, sock, table))
+    
+    # Heap of (next send time, camera index); send times are stagger + frame / rate
+    staggers = [index / len(cameras) / spec.rate for index, spec in enumerate(cameras)]
+    heap = [(stagger, index) for index, stagger in enumerate(staggers)]
+    heapq.heapify(heap)
+    
+    total_rate = sum(spec.rate for spec in cameras)
+    print(f"Simulating {len(cameras)} cameras, {total_rate:.0f} packets/second in total")
+    print(f"Sending to {target_ip}:{target_port}")
+    print("Press Ctrl+C to stop...")
+    
+    pacer.start()
+    next_report = 1.0
+    last_sent = 0
+    try:
+        while heap:
+            send_time, index = heapq.heappop(heap)
+            camera = states[index]
+            spec = camera.spec
+            frame = camera.frame
+            camera.frame = frame + 1
+            next_time = staggers[index] + camera.frame / spec.rate
+            if not duration or next_time < duration:
+                heapq.heappush(heap, (next_time, index))
             
-            frame += 1
+            if pacer.should_skip(next_time):
+                camera.skipped += 1
+                continue
+            pacer.wait(send_time)
+            if camera.table is not None:
+                camera.sock.sendto(camera.table.packet(frame), target)
+            else:
+                x, y, z, pan, tilt, roll = camera.pattern(frame / spec.rate + spec.phase * PATTERN_PERIOD)
+                encode_freed_packet_into(camera.packet, 0, frame, x, y, z, pan, tilt, roll,
+                                         zoom=1.0, focus=0.5)
+                camera.sock.sendto(camera.packet, target)
+            camera.sent += 1
             
-            # Maintain packet rate
-            next_packet = start_time + (frame / packet_rate)
-            sleep_time = next_packet - time.time()
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            # Status update every second
+            if send_time >= next_report:
+                sent = pacer.sent
+                print(f"\rTime: {send_time:.0f}s, Rate: {sent - last_sent} packets/sec", end="")
+                last_sent = sent
+                next_report += 1.0
     
     except KeyboardInterrupt:
         print("\nSimulation stopped by user")
     finally:
-        sock.close()
+        for camera in states:
+            camera.sock.close()
     
-    print("\nSimulation complete!")
-    print(f"Sent {frame} frames over {elapsed:.1f} seconds")
-    print(f"Average rate: {frame/elapsed:.1f} packets/second")
+    elapsed = (pacer.clock() - pacer.epoch) / 1e9
+    if not heap:
+        elapsed = max(elapsed, duration)  # Ran to completion: the last frame interval counts
+    print(f"\n\n{'Camera':>6} {'Pattern':<10} {'Phase':>5} {'Requested':>10} {'Achieved':>10} "
+          f"{'Sent':>9} {'Skipped':>8}")
+    for index, camera in enumerate(states):
+        spec = camera.spec
+        achieved = camera.sent / elapsed if elapsed > 0 else 0.0
+        print(f"{index:>6} {spec.pattern:<10} {spec.phase:5.2f} {spec.rate:10.1f} {achieved:10.1f} "
+              f"{camera.sent:9d} {camera.skipped:8d}")
+    sent = sum(camera.sent for camera in states)
+    if elapsed > 0:
+        print(f"Total: {sent} packets in {elapsed:.1f} seconds, "
+              f"{sent / elapsed:.0f} of {total_rate:.0f} packets/second requested")
+    print(pacer.summary())
+    return states
+
+def pattern_arrays(pattern: str, t) -> tuple:
+    """Vectorized PATTERNS: (x, y, z, pan, tilt, roll) arrays for an array of times"""
+    import numpy as np
+    
+    t = np.asarray(t, dtype=np.float64)
+    w = t * 2 * np.pi / PATTERN_PERIOD
+    zeros = np.zeros_like(w)
+    if pattern == 'circle':
+        return (PATTERN_SIZE * np.cos(w), PATTERN_SIZE * np.sin(w), zeros + PATTERN_HEIGHT,
+                np.degrees(w), zeros, zeros.copy())
+    if pattern == 'figure8':
+        denominator = 1 + np.sin(w) ** 2
+        x = PATTERN_SIZE * np.cos(w) / denominator
+        y = PATTERN_SIZE * np.sin(w) * np.cos(w) / denominator
+        return x, y, zeros + PATTERN_HEIGHT, np.degrees(np.arctan2(y, x)), zeros, zeros.copy()
+    if pattern == 'oscillate':
+        return (PATTERN_SIZE * np.sin(w), zeros, PATTERN_HEIGHT + PATTERN_SIZE * np.cos(w) / 2,
+                30 * np.sin(w), 15 * np.cos(w), zeros.copy())
+    raise ValueError(f'Unknown pattern: {pattern}')
+
+# Row format of the network_test_mode CSV log for a valid packet
+CSV_ROW = '%s,%s,%d,true,%d,%.2f,%.2f,%.2f,%.2f,%.2f,%.2f,%.2f,%.2f\n'
 
-def main():
+def generate_capture(outputs: List[str], pattern: str, duration: float, rate: float,
+                     noise: float = 0.0, angle_noise: float = 0.0, jitter: float = 0.0,
+                     dropout: float = 0.0, reorder: float = 0.0, seed: Optional[int] = None,
+                     source: tuple = ('127.0.0.1', 50000), start: Optional[float] = None,
+                     chunk_frames: int = 1 << 20) -> int:
+    """
+    Write a synthetic recording without network or pacing.
+    
+    The pattern is evaluated with NumPy over the whole time axis, in
+    chunks of chunk_frames so memory stays flat for any duration. Options:
+    Gaussian pose noise (noise in mm, angle_noise in degrees), Gaussian
+    arrival-time jitter (seconds, arrival order stays monotonic), dropouts
+    (probability a packet is missing) and reordering (probability a packet
+    swaps places with its successor). Each output ending in .csv is
+    written in the network_test_mode CSV log schema (local timestamps,
+    decoded values as the receiver logs them); any other path gets a
+    binary capture. Returns the number of packets written.
+    """
+    import numpy as np
+    from freed_capture import LOG_HEADER, CaptureWriter
+    from freed_codec import decode_freed_records, encode_many, freed_record_dtype
+    
+    if pattern not in PATTERNS:
+        raise ValueError(f'Unknown pattern: {pattern}')
+    rng = np.random.default_rng(seed)
+    start = time.time() if start is None else start
+    start_ns = int(start * 1e9)
+    local_offset_ns = time.localtime(start).tm_gmtoff * 1_000_000_000
+    total = math.ceil(duration * rate)
+    
+    csv_files, captures = [], []
+    for path in outputs:
+        if path.lower().endswith('.csv'):
+            f = open(path, 'w')
+            f.write(LOG_HEADER)
+            csv_files.append(f)
+        else:
+            captures.append(CaptureWriter(path))
+    
+    written = 0
+    last_arrival = start_ns
+    try:
+        for first in range(0, total, chunk_frames):
+            frame = np.arange(first, min(first + chunk_frames, total), dtype=np.int64)
+            count = len(frame)
+            t = frame / rate
+            x, y, z, pan, tilt, roll = pattern_arrays(pattern, t)
+            if noise:
+                x, y, z = (values + rng.normal(0.0, noise, count) for values in (x, y, z))
+            if angle_noise:
+                pan, tilt, roll = (values + rng.normal(0.0, angle_noise, count) for values in (pan, tilt, roll))
+            
+            arrival = start_ns + np.round(t * 1e9).astype(np.int64)
+            if jitter:
+                arrival += np.round(rng.normal(0.0, jitter * 1e9, count)).astype(np.int64)
+                arrival = np.maximum.accumulate(np.maximum(arrival, last_arrival))
+            last_arrival = int(arrival[-1])
+            
+            # Reordering swaps packet contents; arrival times stay in order
+            order = np.arange(count)
+            if reorder:
+                swap = rng.random(count - 1) < reorder
+                swap[1:] &= ~swap[:-1]  # No overlapping swaps
+                index = np.flatnonzero(swap)
+                order[index], order[index + 1] = index + 1, index
+            keep = rng.random(count) >= dropout if dropout else np.ones(count, dtype=bool)
+            order = order[keep]
+            arrival = arrival[keep]
+            
+            buffer = encode_many(frame[order], x[order], y[order], z[order],
+                                 pan[order], tilt[order], roll[order], 1.0, 0.5)
+            for capture in captures:
+                capture.write_many(arrival, source, True, buffer, PACKET_SIZE)
+            if csv_files:
+                columns = decode_freed_records(np.frombuffer(buffer, dtype=freed_record_dtype(PACKET_SIZE)))
+                stamps = np.char.replace(np.datetime_as_string(
+                    (arrival + local_offset_ns).astype('datetime64[ns]'), unit='ms'), 'T', ' ')
+                ip, port = source
+                text = ''.join([CSV_ROW % (stamp, ip, port, *row) for stamp, *row in zip(
+                    stamps.tolist(), columns.frame_number.tolist(),
+                    columns.x_pos.tolist(), columns.y_pos.tolist(), columns.z_pos.tolist(),
+                    columns.pan.tolist(), columns.tilt.tolist(), columns.roll.tolist(),
+                    columns.zoom.tolist(), columns.focus.tolist())])
+                for f in csv_files:
+                    f.write(text)
+            written += len(order)
+    finally:
+        for f in csv_files:
+            f.close()
+        for capture in captures:
+            capture.close()
+    return written
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Simulate FreeD camera movement patterns')
     parser.add_argument('pattern', choices=['circle', 'figure8', 'oscillate'],
                       help='Movement pattern to simulate')
@@ -128,16 +423,87 @@ def main():
                       help='Target IP address (default: 127.0.0.1)')
     parser.add_argument('--port', type=int, default=6000,
                       help='Target port number (default: 6000)')
+    parser.add_argument('--target', type=parse_target, action='append', default=[],
+                      metavar='IP:PORT[,delay=S][,frame_offset=N]',
+                      help='Send to this destination instead of --ip/--port '
+                           '(repeatable; each frame is encoded once for all targets)')
     parser.add_argument('--rate', type=int, default=30,
                       help='Packet rate in Hz (default: 30)')
     parser.add_argument('--duration', type=float, default=0.0,
                       help='Duration in seconds (default: 0 = run indefinitely)')
+    parser.add_argument('--spin', type=float, default=0.001,
+                      help='Busy-wait this many seconds before each send time '
+                           'instead of sleeping (default: 0.001)')
+    parser.add_argument('--late', choices=PACING_POLICIES, default='catch-up',
+                      help='When behind schedule, send overdue frames back to back '
+                           '(catch-up) or drop them (skip) (default: catch-up)')
+    parser.add_argument('--cameras', type=int, default=0,
+                      help='Simulate N cameras of the given pattern at --rate, with '
+                           'evenly spread phases (multi-camera load generator)')
+    parser.add_argument('--camera', type=parse_camera, action='append', default=[],
+                      metavar='PATTERN[:RATE[:PHASE]]',
+                      help='Add a camera with its own pattern, rate and phase '
+                           '(repeatable; implies the multi-camera mode)')
+    parser.add_argument('--source-port', type=int, default=0,
+                      help='Bind camera i to this source port + i in the multi-camera '
+                           'mode (default: 0 = ephemeral ports)')
+    parser.add_argument('--output', action='append', default=[], metavar='FILE',
+                      help='Write a synthetic recording instead of sending: CSV log '
+                           'for *.csv, binary capture otherwise (repeatable; needs --duration)')
+    parser.add_argument('--noise', type=float, default=0.0,
+                      help='Offline: position noise standard deviation in mm (default: 0)')
+    parser.add_argument('--angle-noise', type=float, default=0.0,
+                      help='Offline: rotation noise standard deviation in degrees (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                      help='Offline: arrival time jitter standard deviation in seconds (default: 0)')
+    parser.add_argument('--dropout', type=float, default=0.0,
+                      help='Offline: probability that a packet is missing (default: 0)')
+    parser.add_argument('--reorder', type=float, default=0.0,
+                      help='Offline: probability that a packet swaps with the next (default: 0)')
+    parser.add_argument('--seed', type=int,
+                      help='Offline: random seed for reproducible noise')
+    parser.add_argument('--source', type=parse_listen_address, default=('127.0.0.1', 50000),
+                      metavar='IP:PORT',
+                      help='Offline: source address recorded for the packets (default: 127.0.0.1:50000)')
+    parser.add_argument('--precompute', action='store_true',
+                      help='Encode one pattern period up front and only patch frame '
+                           'numbers while sending (for high-rate stress tests)')
+    
+    args = parser.parse_args(argv)
+    
+    if args.output:
+        if args.duration <= 0:
+            parser.error('--output needs a --duration')
+        started = time.perf_counter()
+        try:
+            written = generate_capture(args.output, args.pattern, args.duration, args.rate,
+                                       args.noise, args.angle_noise, args.jitter, args.dropout,
+                                       args.reorder, args.seed, args.source)
+        except Exception as e:
+            print(f"Error in simulation: {e}")
+            return 1
+        print(f"Wrote {written} packets ({args.duration:g} s at {args.rate} Hz) to "
+              f"{', '.join(args.output)} in {time.perf_counter() - started:.1f} seconds")
+        return 0
     
-    args = parser.parse_args()
+    if args.cameras or args.camera:
+        if args.target:
+            parser.error('--target cannot be combined with --cameras/--camera')
+        cameras = [spec._replace(rate=spec.rate or args.rate) for spec in args.camera]
+        cameras += [CameraSpec(args.pattern, args.rate, index / args.cameras)
+                    for index in range(args.cameras)]
+        try:
+            simulate_cameras(cameras, args.ip, args.port, args.duration,
+                             args.spin, args.late, args.source_port, args.precompute)
+        except Exception as e:
+            print(f"Error in simulation: {e}")
+            return 1
+        return 0
     
     try:
         simulate_freed_data(args.pattern, args.ip, args.port, 
-                          args.duration, args.rate)
+                          args.duration, args.rate, args.spin, args.late, args.target,
+                          args.precompute)
     except Exception as e:
         print(f"Error in simulation: {e}")
         return 1
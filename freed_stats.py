@@ -0,0 +1,261 @@
+from collections import deque, namedtuple
+
+FRAME_MASK = 0xFFFFFFFF   # Frame numbers are 32-bit counters
+FRAME_HALF = 0x80000000
+
+# One recorded stream anomaly. count is the number of frames involved
+# (missing frames for a gap, 1 otherwise).
+Anomaly = namedtuple('Anomaly', ['kind', 'frame', 'expected', 'count', 'timestamp'])
+
+class StreamTracker:
+    """
+    Frame-number continuity tracking for one source, O(1) per packet.
+    
+    The tracker keeps the highest frame number seen and a bitmap of the
+    frames skipped within the `window` frames below it. Forward jumps
+    count the skipped frames as lost; a late frame that fills one of those
+    holes is counted as out-of-order and no longer lost, and any other
+    frame at or below the highest is a duplicate. A jump backwards beyond
+    the window is treated as a sender restart and resynchronises the
+    tracker. Frame arithmetic is modulo 2**32, so counter wraparound is
+    a normal forward step (and is counted in `wraps`).
+    """
+    
+    def __init__(self, window: int = 64, history: int = 16):
+        self.window = window
+        self.highest = None
+        self.frames = 0          # Valid packets seen
+        self.gaps = 0            # Forward jumps that skipped frames
+        self.lost = 0            # Frames skipped and not (yet) received late
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.wraps = 0
+        self.resets = 0
+        self.anomalies = deque(maxlen=history)
+        self._holes = 0          # Bit i set: frame (highest - i) is missing
+        self._window_mask = (1 << window) - 1
+    
+    @property
+    def expected(self) -> int:
+        """Frames the sender is believed to have sent"""
+        return self.frames - self.duplicates + self.lost
+    
+    @property
+    def loss_rate(self) -> float:
+        """Fraction of expected frames that never arrived"""
+        expected = self.expected
+        return self.lost / expected if expected else 0.0
+    
+    def update(self, frame: int, timestamp: float = None) -> str:
+        """
+        Record a frame number. Returns the anomaly kind ('gap', 'duplicate',
+        'out_of_order', 'reset') or None for an in-sequence frame.
+        """
+        self.frames += 1
+        highest = self.highest
+        if highest is None:
+            self.highest = frame
+            return None
+        
+        step = (frame - highest) & FRAME_MASK
+        if step == 0:
+            return self._anomaly('duplicate', frame, (highest + 1) & FRAME_MASK, 1, timestamp)
+        
+        if step < FRAME_HALF:
+            # Forward; the normal case is step == 1
+            if frame < highest:
+                self.wraps += 1
+            self.highest = frame
+            # Shift existing holes and mark the skipped frames (1 .. step-1 below);
+            # a jump past the window leaves only skipped frames in it, and
+            # shifting by it would build an int as large as the jump
+            if step < self.window:
+                self._holes = ((self._holes << step) | ((1 << (step - 1)) - 1) << 1) & self._window_mask
+            else:
+                self._holes = self._window_mask & ~1
+            if step == 1:
+                return None
+            self.gaps += 1
+            self.lost += step - 1
+            return self._anomaly('gap', frame, (highest + 1) & FRAME_MASK, step - 1, timestamp)
+        
+        back = FRAME_MASK + 1 - step
+        if back < self.window:
+            bit = 1 << back
+            if not self._holes & bit:
+                return self._anomaly('duplicate', frame, (highest + 1) & FRAME_MASK, 1, timestamp)
+            self._holes &= ~bit
+            self.lost -= 1
+            self.out_of_order += 1
+            return self._anomaly('out_of_order', frame, (highest + 1) & FRAME_MASK, 1, timestamp)
+        
+        # Too far back to be a late packet: the sender restarted its counter
+        self.resets += 1
+        self.highest = frame
+        self._holes = 0
+        return self._anomaly('reset', frame, (highest + 1) & FRAME_MASK, 1, timestamp)
+    
+    def _anomaly(self, kind: str, frame: int, expected: int, count: int, timestamp: float) -> str:
+        if kind == 'duplicate':
+            self.duplicates += 1
+        self.anomalies.append(Anomaly(kind, frame, expected, count, timestamp))
+        return kind
+    
+    def summary(self) -> str:
+        """One-line description of the stream counters"""
+        return (f'{self.frames} frames, {self.lost} lost ({self.loss_rate * 100:.2f}%) '
+                f'in {self.gaps} gaps, {self.duplicates} duplicates, '
+                f'{self.out_of_order} out of order, {self.wraps} wraps, {self.resets} resets')
+
+class LatencyHistogram:
+    """
+    Log-bucketed (HDR-style) histogram of non-negative integer values.
+    
+    Values below 2**sub_bits are counted exactly; larger values fall into
+    2**(sub_bits-1) linear sub-buckets per power of two, so the relative
+    error of a reported quantile is below 2**-(sub_bits-1) (about 6% for
+    the default). Recording is a bit_length, a shift and an increment;
+    memory is a fixed list of counters. Values above max_value are counted
+    in the top bucket (the exact maximum is still tracked).
+    """
+    
+    def __init__(self, sub_bits: int = 5, max_value: int = 1 << 40):
+        self.sub_bits = sub_bits
+        self._half = 1 << (sub_bits - 1)
+        self._limit = 1 << sub_bits
+        self._max_index = self._index(max_value)
+        self.counts = [0] * (self._max_index + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+    
+    def _index(self, value: int) -> int:
+        if value < self._limit:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return shift * self._half + (value >> shift)
+    
+    def _upper_bound(self, index: int) -> int:
+        """Largest value that maps to a bucket index"""
+        if index < self._limit:
+            return index
+        shift, mantissa = divmod(index, self._half)
+        shift -= 1
+        mantissa += self._half
+        return ((mantissa + 1) << shift) - 1
+    
+    def record(self, value: int) -> None:
+        """Record one integer value (negative values count as zero)"""
+        if value < self._limit:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            shift = value.bit_length() - self.sub_bits
+            index = shift * self._half + (value >> shift)
+            if index > self._max_index:
+                index = self._max_index
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def percentile(self, percent: float) -> int:
+        """Value at or below which `percent` % of recorded values fall"""
+        if not self.count:
+            return 0
+        target = max(1, -(-self.count * percent // 100))  # ceil
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= target:
+                if index == self._max_index:  # Overflow bucket has no upper bound
+                    return self.max
+                return min(self._upper_bound(index), self.max)
+        return self.max
+    
+    def record_many(self, values) -> None:
+        """record() for an array of integer values, in one vectorized step"""
+        import numpy as np
+        
+        values = np.maximum(np.asarray(values, dtype=np.int64), 0)
+        if not len(values):
+            return
+        # frexp's exponent is the bit length (exact up to 2**53)
+        shift = np.maximum(np.frexp(values)[1] - self.sub_bits, 0)
+        index = np.minimum(shift * self._half + (values >> shift), self._max_index)
+        for position, bucket in enumerate(np.bincount(index, minlength=len(self.counts)).tolist()):
+            if bucket:
+                self.counts[position] += bucket
+        self.count += len(values)
+        self.total += int(values.sum())
+        self.max = max(self.max, int(values.max()))
+    
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """Add the counts of a histogram with the same layout"""
+        for index, bucket in enumerate(other.counts):
+            self.counts[index] += bucket
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+    
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+    
+    def summary(self, scale: float = 1e6, unit: str = 'ms') -> str:
+        """p50/p99/p99.9/max line, with values divided by `scale`"""
+        if not self.count:
+            return 'no samples'
+        return (f'p50 {self.percentile(50) / scale:.3f} p99 {self.percentile(99) / scale:.3f} '
+                f'p99.9 {self.percentile(99.9) / scale:.3f} max {self.max / scale:.3f} {unit}')
+
+class RunningStats:
+    """
+    Count, mean, variance and range of a stream of values in O(1) memory.
+    
+    Whole arrays are folded in at once with the parallel form of Welford's
+    algorithm, so the result does not depend on how the stream is chunked.
+    NaN and infinite values are ignored.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self._m2 = 0.0   # Sum of squared deviations from the mean
+    
+    def update(self, values) -> None:
+        """Add an array (or any sequence) of values"""
+        import numpy as np
+        
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        count = len(values)
+        if not count:
+            return
+        mean = float(values.mean())
+        total = self.count + count
+        delta = mean - self.mean
+        self._m2 += float(((values - mean) ** 2).sum()) + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+    
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for fewer than two values)"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self) -> float:
+        return self.variance ** 0.5
@@ -1,8 +1,13 @@
 import unittest
 import sys
+from datetime import datetime
 from colorama import init, Fore, Style
 from test_freed_validator import TestFreeDValidator
-from freed_validator import FreeDPacket, parse_freed_packet
+from freed_codec import FreeDPacket, RecvPool, encode_freed_packet, parse_freed_packet
+from freed_server import SourceHandler
+from freed_display import DISPLAY_MODES, StatsReporter, SummaryDisplay
+from freed_metrics import MetricsServer, render_metrics
+from freed_capture import LOG_HEADER, BackgroundWriter, CaptureWriter
 
 class FreeDTestRunner:
     def __init__(self):
@@ -27,28 +32,15 @@ class FreeDTestRunner:
         }
         values = {**default_values, **kwargs}
         
-        # Convert values to byte format
-        data = bytearray()
-        data.append(values['packet_id'])
-        data.append(values['packet_type'])
-        data.append(values['version'])
-        data.extend(values['frame_number'].to_bytes(4, 'big'))
-        
-        # Position data (scaled by 64)
-        for pos in ['x_pos', 'y_pos', 'z_pos']:
-            scaled = int(values[pos] * 64)
-            data.extend(scaled.to_bytes(4, 'big', signed=True))
-        
-        # Rotation data (scaled by 32768)
-        for rot in ['pan', 'tilt', 'roll']:
-            scaled = int(values[rot] * 32768)
-            data.extend(scaled.to_bytes(4, 'big', signed=True))
-            
-        # Optional lens data
-        data.extend(int(values['zoom'] * 32768).to_bytes(4, 'big', signed=True))
-        data.extend(int(values['focus'] * 32768).to_bytes(4, 'big', signed=True))
-        
-        return bytes(data)
+        return encode_freed_packet(
+            values['frame_number'],
+            values['x_pos'], values['y_pos'], values['z_pos'],
+            values['pan'], values['tilt'], values['roll'],
+            values['zoom'], values['focus'],
+            packet_id=values['packet_id'],
+            packet_type=values['packet_type'],
+            version=values['version']
+        )
     
     def run_test(self, name, packet_data, expected_valid):
         """Run a single test and record the result"""
@@ -161,7 +153,25 @@ def print_packet_info(packet, source_info=""):
         print(f"Rotation: Pan={packet.pan:.2f}, Tilt={packet.tilt:.2f}, Roll={packet.roll:.2f}")
         print(f"Lens: Zoom={packet.zoom:.2f}, Focus={packet.focus:.2f}")
 
-def network_test_mode(ip, port, duration=60, log_file=None):
+def format_log_time(timestamp):
+    """Format a time.time() value the way the CSV log stores it"""
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def format_log_row(entry):
+    """Format a (time.time(), addr, packet, is_valid) entry as a CSV log line"""
+    timestamp, addr, packet, is_valid = entry
+    timestamp = format_log_time(timestamp)
+    if is_valid and packet:
+        return (f"{timestamp},{addr[0]},{addr[1]},true,{packet.frame_number},"
+                f"{packet.x_pos:.2f},{packet.y_pos:.2f},{packet.z_pos:.2f},"
+                f"{packet.pan:.2f},{packet.tilt:.2f},{packet.roll:.2f},"
+                f"{packet.zoom:.2f},{packet.focus:.2f}\n")
+    return f"{timestamp},{addr[0]},{addr[1]},false,,,,,,,,,\n"
+
+def network_test_mode(ip, port, duration=60, log_file=None, capture_file=None,
+                      flush_interval=1.0, flush_bytes=1 << 20, log_queue=65536,
+                      display='summary', refresh=4.0, rate=None, stats_interval=0.0,
+                      metrics_port=None, metrics_host='127.0.0.1'):
     """
     Listen for FreeD packets from a specific IP and port
     
@@ -169,22 +179,35 @@ def network_test_mode(ip, port, duration=60, log_file=None):
         ip (str): IP address to listen on
         port (int): Port number to listen on
         duration (int): How long to listen for packets in seconds
+        log_file (str): Optional CSV log file path
+        capture_file (str): Optional binary capture file path
+        flush_interval (float): Maximum seconds between log/capture flushes
+        flush_bytes (int): Flush once this many bytes have been written
+        log_queue (int): Entries buffered per writer before new ones are dropped
+        display (str): 'summary' dashboard, per-'packets' output, or 'none'
+        refresh (float): Summary dashboard refresh rate in Hz
+        rate (float): Nominal packet rate in Hz for timing deviation
+        stats_interval (float): Seconds between timing reports without the dashboard
+        metrics_port (int): Optional TCP port for the Prometheus metrics endpoint
+        metrics_host (str): Address the metrics endpoint binds to
     """
     import socket
     import time
-    from datetime import datetime
     
     print(f"\n{Fore.YELLOW}=== FreeD Network Test Mode ==={Style.RESET_ALL}")
     print(f"Listening on {ip}:{port} for {duration} seconds...")
     
     # Create UDP socket
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.settimeout(1.0)  # 1 second timeout for clean exit
     try:
         sock.bind((ip, port))
     except socket.error as e:
         print(f"{Fore.RED}Error binding to {ip}:{port}: {e}{Style.RESET_ALL}")
         return
+    sock.setblocking(False)
+    pool = RecvPool()
+    # Converts the pool's perf_counter_ns() arrival stamps to wall-clock time
+    wall_offset_ns = time.time_ns() - time.perf_counter_ns()
     
     start_time = time.time()
     last_rate_check = start_time
@@ -192,28 +215,40 @@ def network_test_mode(ip, port, duration=60, log_file=None):
     valid_count = 0
     invalid_count = 0
     rate_window_packets = 0
+    sources = {}
+    dashboard = None
+    if display == 'summary':
+        dashboard = SummaryDisplay(sources, fps=refresh, title='FreeD Network Test')
+    elif stats_interval > 0:
+        dashboard = StatsReporter(sources, stats_interval)
     
-    # Setup logging if requested
-    log_file_handle = None
+    # Setup logging if requested. Log lines and capture records are written
+    # by background threads so the receive loop never waits on disk I/O.
+    writer_options = dict(max_queue=log_queue, flush_interval=flush_interval,
+                          flush_bytes=flush_bytes)
+    log_writer = None
     if log_file:
         try:
             log_file_handle = open(log_file, 'w')
-            log_file_handle.write("timestamp,source_ip,source_port,valid,frame,x_pos,y_pos,z_pos,pan,tilt,roll,zoom,focus\n")
+            log_file_handle.write(LOG_HEADER)
+            log_writer = BackgroundWriter(log_file_handle, formatter=format_log_row,
+                                          **writer_options)
         except IOError as e:
             print(f"{Fore.RED}Error opening log file: {e}{Style.RESET_ALL}")
             log_file = None
     
-    def log_packet(timestamp, addr, packet, is_valid):
-        """Log packet data to CSV file"""
-        if log_file_handle:
-            if is_valid and packet:
-                log_file_handle.write(f"{timestamp},{addr[0]},{addr[1]},true,{packet.frame_number},"
-                                    f"{packet.x_pos:.2f},{packet.y_pos:.2f},{packet.z_pos:.2f},"
-                                    f"{packet.pan:.2f},{packet.tilt:.2f},{packet.roll:.2f},"
-                                    f"{packet.zoom:.2f},{packet.focus:.2f}\n")
-            else:
-                log_file_handle.write(f"{timestamp},{addr[0]},{addr[1]},false,,,,,,,,,\n")
-            log_file_handle.flush()
+    capture = None
+    if capture_file:
+        try:
+            capture = CaptureWriter(capture_file, background=True, **writer_options)
+        except IOError as e:
+            print(f"{Fore.RED}Error opening capture file: {e}{Style.RESET_ALL}")
+    
+    metrics = None
+    if metrics_port:
+        writers = {'log': log_writer, 'capture': capture and capture.writer}
+        metrics = MetricsServer(lambda: render_metrics(sources, writers, ports=[port]),
+                                metrics_port, metrics_host).start()
     
     try:
         print(f"Press Ctrl+C to stop...")
@@ -221,40 +256,60 @@ def network_test_mode(ip, port, duration=60, log_file=None):
             current_time = time.time()
             
             # Calculate and display packet rate every second
-            if current_time - last_rate_check >= 1.0:
-                rate = rate_window_packets / (current_time - last_rate_check)
-                print(f"\rPacket Rate: {rate:.1f} packets/sec", end="")
+            if not dashboard and current_time - last_rate_check >= 1.0:
+                packet_rate = rate_window_packets / (current_time - last_rate_check)
+                print(f"\rPacket Rate: {packet_rate:.1f} packets/sec", end="")
                 rate_window_packets = 0
                 last_rate_check = current_time
-            try:
-                data, addr = sock.recvfrom(4096)
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            # Timeout keeps the display refreshing and allows a clean exit;
+            # drains all queued datagrams
+            batch = pool.receive(sock, dashboard.interval if dashboard else 1.0)
+            
+            for data, addr, arrival_ns in batch:
+                timestamp_ns = wall_offset_ns + arrival_ns
+                timestamp = timestamp_ns / 1e9
                 packet_count += 1
                 rate_window_packets += 1
                 
+                handler = sources.get(addr)
+                if handler is None:
+                    handler = sources[addr] = SourceHandler(addr, verbose=False, nominal_rate=rate)
+                decode_start = time.perf_counter_ns()
                 packet, is_valid = parse_freed_packet(data)
+                handler.decode_ns += time.perf_counter_ns() - decode_start
+                handler.handle(data, packet, is_valid, arrival_ns)
                 if is_valid:
                     valid_count += 1
-                    print(f"\n\n{Fore.CYAN}Received packet from {addr[0]}:{addr[1]}{Style.RESET_ALL}")
-                    print(f"Time: {timestamp}")
-                    print_packet_info(packet)
+                    if display == 'packets':
+                        print(f"\n\n{Fore.CYAN}Received packet from {addr[0]}:{addr[1]}{Style.RESET_ALL}")
+                        print(f"Time: {format_log_time(timestamp)}")
+                        print_packet_info(packet)
                 else:
                     invalid_count += 1
-                    print(f"\n\n{Fore.RED}Invalid packet from {addr[0]}:{addr[1]}{Style.RESET_ALL}")
-                    print(f"Time: {timestamp}")
-                    print(f"Raw data: {data.hex()}")
-                
-                log_packet(timestamp, addr, packet, is_valid)
+                    if display == 'packets':
+                        print(f"\n\n{Fore.RED}Invalid packet from {addr[0]}:{addr[1]}{Style.RESET_ALL}")
+                        print(f"Time: {format_log_time(timestamp)}")
+                        print(f"Raw data: {data.hex()}")
                 
-            except socket.timeout:
-                continue
-            except KeyboardInterrupt:
-                break
+                if log_writer:
+                    log_writer.write((timestamp, addr, packet, is_valid))
+                if capture:
+                    capture.write(timestamp_ns, addr, is_valid, data)
+            
+            if dashboard:
+                dashboard.maybe_render()
     
+    except KeyboardInterrupt:
+        # Stop at any point of the loop, including while a batch is processed
+        pass
     finally:
         sock.close()
-        if log_file_handle:
-            log_file_handle.close()
+        if metrics:
+            metrics.close()
+        if log_writer:
+            log_writer.close()
+        if capture:
+            capture.close()
         
     # Print summary
     print(f"\n{Fore.YELLOW}=== Network Test Summary ==={Style.RESET_ALL}")
@@ -264,8 +319,15 @@ def network_test_mode(ip, port, duration=60, log_file=None):
     if packet_count > 0:
         valid_percentage = (valid_count / packet_count) * 100
         print(f"Valid packet rate: {valid_percentage:.1f}%")
+    for handler in sources.values():
+        print(handler.report())
+    for name, writer in (('Log', log_writer), ('Capture', capture and capture.writer)):
+        if writer:
+            print(f"{name} writer: {writer.written} written, "
+                  f"queue high-water {writer.high_water}/{writer.max_queue}, "
+                  f"dropped {writer.dropped}")
 
-if __name__ == '__main__':
+def main(argv=None):
     import argparse
     
     parser = argparse.ArgumentParser(description='FreeD Protocol Test Runner')
@@ -279,11 +341,40 @@ if __name__ == '__main__':
                       help='Duration to listen for packets in seconds (default: 60)')
     parser.add_argument('--log', type=str,
                       help='Log file path for packet data (CSV format)')
+    parser.add_argument('--capture', type=str,
+                      help='Capture file path for raw packets (binary format)')
+    parser.add_argument('--flush-interval', type=float, default=1.0,
+                      help='Maximum seconds between log file flushes (default: 1.0)')
+    parser.add_argument('--flush-bytes', type=int, default=1 << 20,
+                      help='Flush log files after this many bytes (default: 1048576)')
+    parser.add_argument('--log-queue', type=int, default=65536,
+                      help='Log entries buffered before dropping (default: 65536)')
+    parser.add_argument('--display', choices=DISPLAY_MODES, default='summary',
+                      help='Console output in network mode: refreshing per-source '
+                           'summary, every packet, or nothing (default: summary)')
+    parser.add_argument('--refresh', type=float, default=4.0,
+                      help='Summary refresh rate in Hz (default: 4)')
+    parser.add_argument('--rate', type=float,
+                      help='Nominal packet rate in Hz for timing deviation '
+                           '(default: each source\'s mean rate)')
+    parser.add_argument('--stats-interval', type=float, default=0.0,
+                      help='Print timing percentiles every N seconds when not '
+                           'using the summary display (default: 0 = off)')
+    parser.add_argument('--metrics-port', type=int,
+                      help='Serve Prometheus metrics on this TCP port, e.g. 9108 (default: off)')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                      help='Address for the metrics endpoint (default: 127.0.0.1)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.network:
-        network_test_mode(args.ip, args.port, args.duration)
+        network_test_mode(args.ip, args.port, args.duration, args.log, args.capture,
+                          args.flush_interval, args.flush_bytes, args.log_queue,
+                          args.display, args.refresh, args.rate, args.stats_interval,
+                          args.metrics_port, args.metrics_host)
     else:
         runner = FreeDTestRunner()
         runner.run_all_tests()
+
+if __name__ == '__main__':
+    main()
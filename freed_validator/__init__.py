@@ -1,7 +1,23 @@
-from .freed_validator import main
-from .freed_test_runner import main as test_main
-from .freed_replayer import main as replay_main
-from .freed_simulator import main as simulate_main
-from .analyze_freed_log import main as analyze_main
+import importlib
 
 __version__ = "1.0.0"
+
+# Tool entry points, as (top-level module, function). They are resolved on
+# first access, so importing the package (e.g. for `freed --version`) does
+# not load the tools or their dependencies (pandas, matplotlib, colorama).
+# The validator is freed_server: this package shadows freed_validator.py.
+_ENTRY_POINTS = {
+    'main': ('freed_server', 'main'),
+    'test_main': ('freed_test_runner', 'main'),
+    'replay_main': ('freed_replayer', 'main'),
+    'simulate_main': ('freed_simulator', 'main'),
+    'analyze_main': ('analyze_freed_log', 'main'),
+    'bench_main': ('freed_bench', 'main'),
+}
+
+def __getattr__(name):
+    try:
+        module, function = _ENTRY_POINTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    return getattr(importlib.import_module(module), function)
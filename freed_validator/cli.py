@@ -3,16 +3,22 @@
 
 import sys
 import argparse
-from . import (
-    main as validator_main,
-    test_main,
-    replay_main,
-    simulate_main,
-    analyze_main,
-    __version__
-)
+from . import __version__
 
-def main():
+# Subcommand -> (help, package entry point). Each tool parses its own
+# options, and its module is only imported when its subcommand runs, so
+# e.g. `freed validate` never loads the analysis dependencies.
+COMMANDS = {
+    'validate': ('Run the UDP packet validator', 'main'),
+    'test': ('Run the test suite', 'test_main'),
+    'replay': ('Replay recorded packet data', 'replay_main'),
+    'simulate': ('Generate test patterns', 'simulate_main'),
+    'analyze': ('Analyze recorded data', 'analyze_main'),
+    'bench': ('Run the microbenchmark suite', 'bench_main'),
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
     parser = argparse.ArgumentParser(
         description='FreeD Protocol Validator Toolkit'
     )
@@ -23,79 +29,15 @@ def main():
     )
     
     subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, (help_text, _) in COMMANDS.items():
+        subparsers.add_parser(command, help=help_text, add_help=False)
     
-    # Validator command
-    validate_parser = subparsers.add_parser(
-        'validate',
-        help='Run the UDP packet validator'
-    )
-    validate_parser.add_argument(
-        '--ip',
-        default='0.0.0.0',
-        help='IP address to listen on (default: 0.0.0.0)'
-    )
-    validate_parser.add_argument(
-        '--port',
-        type=int,
-        default=6000,
-        help='Port number to listen on (default: 6000)'
-    )
-    
-    # Test command
-    test_parser = subparsers.add_parser(
-        'test',
-        help='Run the test suite'
-    )
-    test_parser.add_argument(
-        '--network',
-        action='store_true',
-        help='Run in network test mode'
-    )
-    
-    # Replay command
-    replay_parser = subparsers.add_parser(
-        'replay',
-        help='Replay recorded packet data'
-    )
-    replay_parser.add_argument(
-        'log_file',
-        help='Path to the FreeD packet log CSV file'
-    )
-    
-    # Simulate command
-    simulate_parser = subparsers.add_parser(
-        'simulate',
-        help='Generate test patterns'
-    )
-    simulate_parser.add_argument(
-        'pattern',
-        choices=['circle', 'figure8', 'oscillate'],
-        help='Movement pattern to simulate'
-    )
-    
-    # Analyze command
-    analyze_parser = subparsers.add_parser(
-        'analyze',
-        help='Analyze recorded data'
-    )
-    analyze_parser.add_argument(
-        'log_file',
-        help='Path to the FreeD packet log CSV file'
-    )
-    
-    args = parser.parse_args()
+    args, _ = parser.parse_known_args(argv)
+    command_argv = argv[argv.index(args.command) + 1:]
     
     try:
-        if args.command == 'validate':
-            return validator_main()
-        elif args.command == 'test':
-            return test_main()
-        elif args.command == 'replay':
-            return replay_main()
-        elif args.command == 'simulate':
-            return simulate_main()
-        elif args.command == 'analyze':
-            return analyze_main()
+        entry_point = getattr(sys.modules[__package__], COMMANDS[args.command][1])
+        return entry_point(command_argv)
     except KeyboardInterrupt:
         print("\nOperation cancelled by user")
         return 1
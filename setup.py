@@ -15,6 +15,15 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/koensayr/freed_test",
     packages=find_packages(include=["freed_validator", "freed_validator.*"]),
+    # The tools the CLI dispatches to. freed_validator.py is only the script
+    # entry point (the package shadows it); `freed test` runs the
+    # test_freed_validator suite.
+    py_modules=[
+        "analyze_freed_log", "freed_bench", "freed_capture", "freed_codec",
+        "freed_display", "freed_downsample", "freed_fanout", "freed_metrics",
+        "freed_pacing", "freed_replayer", "freed_server", "freed_simulator",
+        "freed_stats", "freed_test_runner", "test_freed_validator",
+    ],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -0,0 +1,129 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from analyze_freed_log import (
+    LogStatistics, analyze_directory, cache_path, find_session_logs, load_and_process_log,
+    load_log_cache, plot_packet_analysis, stream_statistics, summary_table
+)
+from freed_capture import LOG_HEADER
+
+class TestLogStatistics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        count = 1000
+        self.df = pd.DataFrame({
+            'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(
+                np.cumsum(rng.uniform(0.01, 0.03, count)), unit='s'),
+            'source_ip': '127.0.0.1', 'source_port': 6000,
+            'valid': rng.random(count) > 0.1,
+            'frame': np.delete(np.arange(count + 3), [100, 500, 501]),
+            'x_pos': rng.normal(0, 100, count), 'y_pos': rng.normal(0, 100, count),
+            'z_pos': rng.normal(0, 100, count), 'pan': rng.uniform(-180, 180, count),
+            'tilt': rng.uniform(-90, 90, count), 'roll': np.zeros(count),
+            'zoom': np.ones(count), 'focus': np.full(count, 0.5),
+        })
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.df.to_csv(self.path, index=False, header=LOG_HEADER.strip().split(','))
+        
+    def test_streaming_matches_in_memory(self):
+        # Chunked single-pass results equal the whole-log pandas computations
+        df = load_and_process_log(self.path)
+        stats = stream_statistics(self.path, chunk_size=77)
+        
+        valid = df[df['valid'] == True]
+        self.assertEqual((stats.total, stats.valid), (len(df), len(valid)))
+        # Timedelta.total_seconds() is only microsecond-precise
+        self.assertAlmostEqual(stats.duration,
+                               (df['timestamp'].max() - df['timestamp'].min()).total_seconds(), places=6)
+        self.assertEqual(stats.ranges['x_pos'], (valid['x_pos'].min(), valid['x_pos'].max()))
+        self.assertEqual(stats.ranges['tilt'], (valid['tilt'].min(), valid['tilt'].max()))
+        self.assertEqual(stats.intervals.count, len(df) - 1)
+        self.assertAlmostEqual(stats.intervals.mean, df['time_diff'].mean())
+        self.assertAlmostEqual(stats.intervals.std, df['time_diff'].std())
+        self.assertEqual(stats.rate.count, df['packet_rate'].count())
+        self.assertAlmostEqual(stats.rate.min, df['packet_rate'].min(), places=6)
+        self.assertAlmostEqual(stats.rate.max, df['packet_rate'].max(), places=6)
+        self.assertAlmostEqual(stats.rate.mean, df['packet_rate'].mean(), places=6)
+        # Invalid packets count as lost frames too
+        self.assertEqual(stats.expected, valid['frame'].max() - valid['frame'].min() + 1)
+        self.assertEqual(stats.lost, stats.expected - len(valid))
+        median = df['time_diff'].median() * 1e9
+        self.assertLessEqual(abs(stats.quantiles.percentile(50) - median) / median, 1 / 16)
+        
+    def test_cache_round_trip_and_invalidation(self):
+        self.addCleanup(lambda: os.path.exists(cache_path(self.path)) and os.remove(cache_path(self.path)))
+        self.assertIsNone(load_log_cache(self.path))
+        parsed = load_and_process_log(self.path)
+        self.assertTrue(os.path.exists(cache_path(self.path)))
+        
+        cached = load_log_cache(self.path)
+        pd.testing.assert_frame_equal(cached, parsed)
+        pd.testing.assert_frame_equal(load_and_process_log(self.path), parsed)
+        
+        # A log that changed since the cache was built is parsed again
+        with open(self.path, 'a') as f:
+            f.write('2024-01-01 01:00:00.000,127.0.0.1,6000,false,,,,,,,,,\n')
+        self.assertIsNone(load_log_cache(self.path))
+        self.assertEqual(len(load_and_process_log(self.path)), len(parsed) + 1)
+        self.assertEqual(len(load_log_cache(self.path)), len(parsed) + 1)
+        
+        load_and_process_log(self.path, use_cache=False)
+        with open(cache_path(self.path), 'wb') as f:
+            f.write(b'not a cache')
+        self.assertIsNone(load_log_cache(self.path))
+        
+    def test_plots_are_written(self):
+        df = load_and_process_log(self.path, use_cache=False)
+        with tempfile.TemporaryDirectory() as directory:
+            for jobs in (1, 2):
+                prefix = os.path.join(directory, f'jobs{jobs}')
+                plot_packet_analysis(df, prefix, max_points=100, method='lttb', jobs=jobs)
+                for name in ('packet_rate', 'position_trail', 'rotation'):
+                    self.assertGreater(os.path.getsize(f'{prefix}_{name}.png'), 0)
+        
+    def test_directory_summary(self):
+        df = self.df.assign(valid=True)
+        with tempfile.TemporaryDirectory() as directory:
+            df.to_csv(os.path.join(directory, 'a.csv'), index=False,
+                      header=LOG_HEADER.strip().split(','))
+            df.iloc[:500].to_csv(os.path.join(directory, 'b.csv'), index=False,
+                                      header=LOG_HEADER.strip().split(','))
+            with open(os.path.join(directory, 'notes.txt'), 'w') as f:
+                f.write('not a log\n')
+            
+            serial = analyze_directory(directory, use_cache=False)
+            # A summary saved into the directory is not a session of the next run
+            summary_table(serial).to_csv(os.path.join(directory, 'freed_analysis_summary.csv'),
+                                         index=False)
+            self.assertEqual([os.path.basename(path) for path in find_session_logs(directory)],
+                             ['a.csv', 'b.csv'])
+            parallel = analyze_directory(directory, jobs=2, stream=True, chunk_size=64)
+        
+        self.assertEqual([row['session'] for row in serial], ['a.csv', 'b.csv'])
+        for one, other in zip(serial, parallel):
+            self.assertEqual((one['packets'], one['lost']), (other['packets'], other['lost']))
+            self.assertAlmostEqual(one['jitter_ms'], other['jitter_ms'])
+        self.assertEqual((serial[0]['lost'], serial[1]['lost']), (3, 3))
+        
+        table = summary_table(serial)
+        total = table.iloc[-1]
+        self.assertEqual(total['session'], 'ALL')
+        self.assertEqual(total['packets'], len(df) + 500)
+        self.assertEqual(total['lost'], 6)
+        self.assertEqual(total['x_pos_max'], max(serial[0]['x_pos_max'], serial[1]['x_pos_max']))
+        
+    def test_print_without_packets(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            LogStatistics().print()
+        self.assertIn('Total Packets: 0', output.getvalue())
+        self.assertNotIn('Position Range', output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from freed_bench import BENCHMARKS, compare, format_result, main, measure, run_suite
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class TestBench(unittest.TestCase):
+    def test_measure(self):
+        calls = []
+        result = measure(lambda: calls.append(1), repeat=3, min_time=0.0)
+        self.assertEqual((result['number'], result['repeat'], len(calls)), (1, 3, 3))
+        self.assertLessEqual(result['best_s'], result['median_s'])
+        
+    def test_suite_runs_every_benchmark(self):
+        document = run_suite(rows=200, repeat=1, min_time=0.0)
+        
+        self.assertEqual([result['name'] for result in document['results']],
+                         [benchmark.name for benchmark in BENCHMARKS])
+        self.assertEqual(document['options']['rows'], 200)
+        for result in document['results']:
+            self.assertGreater(result['ns_per_item'], 0)
+        loads = [result for result in document['results'] if result['name'].startswith('analyze/')]
+        self.assertEqual({result['items'] for result in loads}, {200})
+        json.dumps(document)  # Machine-readable as is
+        
+    def test_receive_benchmarks_report_syscalls(self):
+        document = run_suite('^receive/', repeat=1, min_time=0.0)
+        results = {result['name']: result for result in document['results']}
+        
+        recvfrom, drain = results['receive/recvfrom'], results['receive/recvpool_drain']
+        self.assertEqual((recvfrom['syscalls_per_item'], recvfrom['wakeups_per_item']), (1.0, 1.0))
+        # One wakeup drains the burst, plus the final empty recvfrom_into
+        self.assertLess(drain['wakeups_per_item'], 1.0)
+        self.assertGreater(drain['syscalls_per_item'], 1.0)
+        self.assertIn('wakeups/item', format_result(drain))
+        
+    def test_json_output_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            current = os.path.join(directory, 'current.json')
+            options = ['--filter', '^parse_freed_packet/', '--repeat', '1', '--min-time', '0']
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main(options + ['--output', baseline]), 0)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(main(options + ['--output', current, '--compare', baseline]), 0)
+            with open(baseline) as f:
+                before = json.load(f)
+            with open(current) as f:
+                after = json.load(f)
+        
+        self.assertEqual(len(after['results']), 4)
+        rows = compare(before, after)
+        self.assertEqual([row[0] for row in rows], [result['name'] for result in after['results']])
+        self.assertIn('parse_freed_packet/invalid_id', output.getvalue())
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(main(['--filter', 'no such benchmark']), 1)
+        
+    @unittest.skipUnless(os.path.isfile(os.path.join(HERE, 'freed_validator', 'cli.py')),
+                         'freed_validator package not present')
+    def test_freed_bench_subcommand(self):
+        from freed_validator import cli
+        
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(cli.main(['bench', '--list']), 0)
+        self.assertEqual(output.getvalue().split(), [benchmark.name for benchmark in BENCHMARKS])
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(cli.main(['bench', '--filter', '^encode_freed_packet_into$',
+                                           '--repeat', '1', '--min-time', '0', '--output', path]), 0)
+            with open(path) as f:
+                document = json.load(f)
+        self.assertEqual([result['name'] for result in document['results']],
+                         ['encode_freed_packet_into'])
+
+if __name__ == '__main__':
+    unittest.main()
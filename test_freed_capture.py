@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from freed_capture import BackgroundWriter, CaptureReader, CaptureWriter, is_capture_file
+from freed_codec import parse_freed_packet
+
+class TestFreeDCapture(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.fdcap')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        
+    def test_round_trip(self):
+        # Records written by CaptureWriter are readable through the mmap reader
+        packet = bytes.fromhex(
+            '440102' '000003E8' '00010000' 'FFFF8000' '00020000'
+            '00004000' 'FFFFD555' '00000000' '00008000' '00004000'
+        )
+        with CaptureWriter(self.path) as writer:
+            writer.write(1_000_000_000, ('192.168.1.50', 50000), True, packet)
+            writer.write(1_016_000_000, ('192.168.1.51', 50001), False, b'\x45bad')
+        
+        self.assertTrue(is_capture_file(self.path))
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 2)
+            self.assertEqual(list(reader.timestamps_ns), [1_000_000_000, 1_016_000_000])
+            self.assertEqual(list(reader.valid), [True, False])
+            self.assertEqual(list(reader.source_ips()), ['192.168.1.50', '192.168.1.51'])
+            self.assertEqual(reader.payload(0), packet)
+            self.assertEqual(reader.payload(1), b'\x45bad')
+            
+            columns = reader.decode()
+            expected, _ = parse_freed_packet(packet)
+            self.assertEqual(columns.frame_number[0], expected.frame_number)
+            self.assertAlmostEqual(columns.tilt[0], expected.tilt)
+            self.assertAlmostEqual(columns.zoom[0], expected.zoom)
+            
+            df = reader.to_dataframe()
+            self.assertEqual(list(df['source_port']), [50000, 50001])
+            self.assertTrue(df['x_pos'].isna()[1])
+        
+    def test_close_with_derived_arrays_alive(self):
+        with CaptureWriter(self.path) as writer:
+            writer.write(1_000_000_000, ('10.0.0.1', 5000), False, b'bad')
+        
+        with CaptureReader(self.path) as reader:
+            timestamps = reader.timestamps_ns
+        reader.close()
+        self.assertEqual(list(timestamps), [1_000_000_000])
+        
+    def test_rejects_csv_log(self):
+        with open(self.path, 'w') as f:
+            f.write("timestamp,source_ip,source_port,valid\n")
+        self.assertFalse(is_capture_file(self.path))
+        with self.assertRaises(ValueError):
+            CaptureReader(self.path)
+
+class StalledFile(io.StringIO):
+    """In-memory file whose writes block until released"""
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        
+    def write(self, chunk):
+        self.release.wait()
+        return super().write(chunk)
+        
+    def close(self):
+        self.contents = self.getvalue()
+        super().close()
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_formats_and_writes_in_order(self):
+        target = StalledFile()
+        target.release.set()
+        writer = BackgroundWriter(target, formatter=lambda n: f"{n}\n")
+        for n in range(100):
+            self.assertTrue(writer.write(n))
+        writer.close()
+        
+        self.assertEqual(target.contents, ''.join(f"{n}\n" for n in range(100)))
+        self.assertEqual((writer.written, writer.dropped), (100, 0))
+        
+    def test_drops_instead_of_blocking_when_stalled(self):
+        target = StalledFile()
+        writer = BackgroundWriter(target, max_queue=4)
+        accepted = sum(writer.write(f"{n}\n") for n in range(50))
+        
+        self.assertLess(accepted, 50)
+        self.assertEqual(writer.dropped, 50 - accepted)
+        self.assertLessEqual(writer.high_water, 4)
+        
+        target.release.set()
+        writer.close()
+        self.assertEqual(writer.written, accepted)
+
+if __name__ == '__main__':
+    unittest.main()
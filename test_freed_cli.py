@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+import unittest
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HAS_PACKAGE = os.path.isfile(os.path.join(HERE, 'freed_validator', 'cli.py'))
+
+# Dependencies only the analysis, replay and test tools may load
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'seaborn', 'colorama')
+
+def run_fresh(code):
+    """Run code in a fresh interpreter; returns (stdout, heavy modules it loaded)"""
+    script = (f'{code}\nimport sys\n'
+              f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', script], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    *output, loaded = result.stdout.splitlines()
+    return '\n'.join(output), [module for module in loaded.split(',') if module]
+
+class TestImportTime(unittest.TestCase):
+    def test_cli_startup_is_light(self):
+        # `freed --version` (the container healthcheck) imports no tool
+        if not HAS_PACKAGE:
+            self.skipTest('freed_validator package not present')
+        output, loaded = run_fresh('from freed_validator.cli import main\n'
+                                   'try:\n    main(["--version"])\n'
+                                   'except SystemExit:\n    pass')
+        self.assertIn('freed-validator', output)
+        self.assertEqual(loaded, [])
+        
+    def test_validate_and_simulate_imports_are_light(self):
+        _, loaded = run_fresh('import freed_server, freed_simulator')
+        self.assertEqual(loaded, [])
+
+def run_cli(*argv):
+    """Run `freed <argv>` in-process; returns (exit code, stdout)"""
+    from freed_validator import cli
+    
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            code = cli.main(list(argv))
+        except SystemExit as e:
+            code = e.code
+    return code, output.getvalue()
+
+def free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@unittest.skipUnless(HAS_PACKAGE, 'freed_validator package not present')
+class TestDispatch(unittest.TestCase):
+    def test_validate_help(self):
+        code, output = run_cli('validate', '--help')
+        self.assertEqual(code, 0)
+        self.assertIn('Validate FreeD packets received over UDP', output)
+        
+    def test_validate_serves_metrics(self):
+        # The compose healthcheck scrapes `freed validate --metrics-port`
+        metrics_port = free_port(socket.SOCK_STREAM)
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'freed_validator.cli', 'validate', '--ip', '127.0.0.1',
+             '--port', str(free_port(socket.SOCK_DGRAM)), '--display', 'none',
+             '--metrics-port', str(metrics_port)],
+            cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{metrics_port}/metrics',
+                                                timeout=1) as response:
+                        body = response.read().decode()
+                    break
+                except OSError:
+                    if process.poll() is not None:
+                        self.fail(f'validator exited: {process.stderr.read()}')
+                    if time.monotonic() > deadline:
+                        self.fail('metrics endpoint did not come up')
+                    time.sleep(0.05)
+        finally:
+            process.terminate()
+            process.wait(5)
+            process.stderr.close()
+        self.assertIn('freed_', body)
+
+if __name__ == '__main__':
+    unittest.main()
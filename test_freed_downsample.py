@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+from freed_downsample import decimate_points, downsample_indices, lttb_indices, minmax_indices
+
+class TestDownsample(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.x = np.arange(100000, dtype=np.float64)
+        self.y = np.sin(self.x / 5000) + rng.normal(0, 0.01, len(self.x))
+        self.y[31337] = 50.0    # Spike
+        self.y[77777] = -50.0
+        
+    def test_minmax_keeps_spikes_within_budget(self):
+        indices = minmax_indices(self.y, 1000)
+        self.assertLessEqual(len(indices), 1000)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertIn(31337, indices)
+        self.assertIn(77777, indices)
+        self.assertEqual(self.y[indices].max(), self.y.max())
+        self.assertEqual(len(minmax_indices(self.y[:10], 1000)), 10)
+        
+        values = np.full(1000, np.nan)
+        values[500] = 1.0
+        self.assertIn(500, minmax_indices(values, 10))
+        
+    def test_lttb_keeps_ends_and_spikes(self):
+        indices = lttb_indices(self.x, self.y, 1000)
+        self.assertEqual(len(indices), 1000)
+        self.assertEqual((indices[0], indices[-1]), (0, len(self.y) - 1))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertIn(31337, indices)
+        self.assertIn(77777, indices)
+        np.testing.assert_array_equal(downsample_indices(self.x, self.y, 1000, 'lttb'), indices)
+        with self.assertRaises(ValueError):
+            downsample_indices(self.x, self.y, 1000, 'every-nth')
+        
+    def test_decimation_thins_dense_regions(self):
+        # A camera parked for 90% of the session, then one sweep across the stage
+        parked = np.tile([[0.0, 0.0, 1500.0]], (90000, 1))
+        sweep = np.column_stack((np.linspace(0, 5000, 10000), np.linspace(0, 2000, 10000),
+                                 np.full(10000, 1500.0)))
+        points = np.concatenate((parked, sweep))
+        indices = decimate_points(points, 500)
+        
+        self.assertLessEqual(len(indices), 500)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertLess(np.sum(indices < 90000), 5)
+        kept = points[indices]
+        self.assertGreater(kept[:, 0].max(), 4900)  # The whole sweep stays visible
+        self.assertEqual(len(decimate_points(points[:100], 500)), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import argparse
+import unittest
+from freed_codec import parse_freed_packet
+from freed_fanout import FanOut, Target, offset_frames, parse_target
+from freed_pacing import Pacer
+from freed_replayer import create_freed_packet
+
+class RecordingSocket:
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+        
+    def sendto(self, data, address):
+        self.sent.append((self.clock.now, address, parse_freed_packet(bytes(data))[0].frame_number))
+        
+    def close(self):
+        pass
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+        
+    def __call__(self):
+        return self.now
+        
+    def sleep(self, seconds):
+        self.now += int(seconds * 1e9)
+
+class TestFreeDFanOut(unittest.TestCase):
+    def test_parse_target(self):
+        self.assertEqual(parse_target('10.0.0.2:6000'), Target(('10.0.0.2', 6000), 0.0, 0))
+        self.assertEqual(parse_target('10.0.0.3:6001,delay=0.004,frame_offset=-2'),
+                         Target(('10.0.0.3', 6001), 0.004, -2))
+        for value in ('10.0.0.2', '10.0.0.2:6000,speed=2', '10.0.0.2:6000,delay=-1'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_target(value)
+        
+    def test_offset_frames_wraps(self):
+        buffer = create_freed_packet(0xFFFFFFFF, 1, 2, 3, 4, 5, 6) + create_freed_packet(7, 0, 0, 0, 0, 0, 0)
+        shifted = offset_frames(buffer, 2)
+        self.assertEqual(parse_freed_packet(shifted[:39])[0].frame_number, 1)
+        self.assertEqual(parse_freed_packet(shifted[39:])[0].frame_number, 9)
+        self.assertEqual(shifted[7:], buffer[7:39] + shifted[39:])
+        
+    def test_fan_out_merges_delayed_targets_across_chunks(self):
+        clock = FakeClock()
+        sock = RecordingSocket(clock)
+        pacer = Pacer(spin=0, clock=clock, sleep=clock.sleep)
+        fanout = FanOut([Target(('a', 1), 0.0, 0), Target(('b', 2), 0.015, 100)], lambda: sock)
+        pacer.start()
+        
+        # Single-packet chunks 10 ms apart, as the simulator sends them
+        for frame in range(3):
+            fanout.send_chunk(pacer, create_freed_packet(frame, 0, 0, 0, 0, 0, 0), [frame * 0.01])
+        fanout.flush(pacer)
+        
+        self.assertEqual(sock.sent, [
+            (0, ('a', 1), 0), (10_000_000, ('a', 1), 1), (15_000_000, ('b', 2), 100),
+            (20_000_000, ('a', 1), 2), (25_000_000, ('b', 2), 101), (35_000_000, ('b', 2), 102),
+        ])
+        self.assertEqual(fanout.sent, 6)
+        
+    def test_simultaneous_targets_share_one_wait(self):
+        clock = FakeClock()
+        sock = RecordingSocket(clock)
+        pacer = Pacer(spin=0, clock=clock, sleep=clock.sleep)
+        targets = [Target(('host', port), 0.0, 0) for port in range(4)]
+        fanout = FanOut(targets, lambda: sock)
+        buffer = b''.join(create_freed_packet(frame, 0, 0, 0, 0, 0, 0) for frame in range(5))
+        
+        fanout.send_chunk(pacer, buffer, [i / 60 for i in range(5)])
+        fanout.flush(pacer)
+        
+        self.assertEqual(fanout.sent, 20)
+        self.assertEqual(pacer.sent, 5)
+        
+    def test_single_target_sends_directly_across_chunks(self):
+        clock = FakeClock()
+        sock = RecordingSocket(clock)
+        pacer = Pacer(spin=0, policy='skip', clock=clock, sleep=clock.sleep)
+        fanout = FanOut([Target(('a', 1), 0.0, 0)], lambda: sock)
+        packets = [create_freed_packet(frame, 0, 0, 0, 0, 0, 0) for frame in range(4)]
+        
+        fanout.send_chunk(pacer, b''.join(packets[:2]), [0.0, 0.01])
+        clock.now = 25_000_000  # Fall behind: frame 1 is overdue once frame 2 is due
+        fanout.send_chunk(pacer, b''.join(packets[2:]), [0.02, 0.03])
+        fanout.flush(pacer)
+        
+        self.assertEqual(sock.sent, [(0, ('a', 1), 0), (25_000_000, ('a', 1), 2),
+                                     (30_000_000, ('a', 1), 3)])
+        self.assertEqual((fanout.sent, pacer.skipped), (3, 1))
+
+if __name__ == '__main__':
+    unittest.main()
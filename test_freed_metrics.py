@@ -0,0 +1,50 @@
+import io
+import unittest
+import urllib.error
+import urllib.request
+from freed_capture import BackgroundWriter
+from freed_codec import FreeDPacket
+from freed_metrics import MetricsServer, render_metrics
+from freed_server import SourceHandler
+
+class TestFreeDMetrics(unittest.TestCase):
+    def make_sources(self):
+        handler = SourceHandler(('10.0.0.5', 40000), verbose=False)
+        for frame in (1, 2, 5):
+            handler.handle(b'', FreeDPacket(0x44, 0x01, 0x02, frame, 0, 0, 0, 0, 0, 0, 0, 0), True)
+        handler.handle(b'bad', None, False)
+        handler.decode_ns = 2_000_000
+        return {handler.address: handler}
+        
+    def test_render_source_counters(self):
+        writer = BackgroundWriter(io.BytesIO())
+        writer.write(b'x')
+        writer.close()
+        
+        text = render_metrics(self.make_sources(), {'log': writer, 'capture': None})
+        
+        self.assertIn('# TYPE freed_packets_total counter', text)
+        self.assertIn('freed_packets_total{source="10.0.0.5:40000"} 4', text)
+        self.assertIn('freed_invalid_packets_total{source="10.0.0.5:40000"} 1', text)
+        self.assertIn('freed_frame_gaps_total{source="10.0.0.5:40000"} 1', text)
+        self.assertIn('freed_frames_lost{source="10.0.0.5:40000"} 2', text)
+        self.assertIn('freed_decode_seconds_total{source="10.0.0.5:40000"} 0.002', text)
+        self.assertIn('freed_interarrival_seconds_count{source="10.0.0.5:40000"} 3', text)
+        self.assertIn('freed_writer_written_total{writer="log"} 1', text)
+        self.assertNotIn('writer="capture"', text)
+        
+    def test_server_renders_on_scrape(self):
+        sources = self.make_sources()
+        server = MetricsServer(lambda: render_metrics(sources), port=0).start()
+        try:
+            url = f'http://127.0.0.1:{server.address[1]}'
+            with urllib.request.urlopen(url + '/metrics', timeout=5) as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                self.assertIn(b'freed_valid_packets_total{source="10.0.0.5:40000"} 3', response.read())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(url + '/other', timeout=5)
+        finally:
+            server.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from freed_pacing import Pacer
+
+class FakeClock:
+    """Nanosecond clock that only advances when slept on or stepped"""
+        
+    def __init__(self):
+        self.now = 0
+        
+    def __call__(self):
+        self.now += 1000  # Every reading costs 1 us
+        return self.now
+        
+    def sleep(self, seconds):
+        self.now += int(seconds * 1e9) + 50_000  # Oversleep by 50 us
+
+class TestPacer(unittest.TestCase):
+    def test_spin_absorbs_oversleep(self):
+        clock = FakeClock()
+        pacer = Pacer(spin=0.001, clock=clock, sleep=clock.sleep)
+        sent = [(index, clock.now) for index in pacer.schedule([0.0, 0.01, 0.02, 0.03])]
+        
+        self.assertEqual([index for index, _ in sent], [0, 1, 2, 3])
+        self.assertEqual(pacer.errors.count, 4)
+        self.assertLessEqual(pacer.errors.max, 5000)
+        # No drift: each send lands on its own deadline, not the previous send
+        self.assertLess(sent[3][1] - pacer.epoch - 30_000_000, 5000)
+        
+    def test_late_policies(self):
+        offsets = [i / 100 for i in range(10)]
+        for policy, expected in (('catch-up', list(range(10))), ('skip', [0, 4, 5, 6, 7, 8, 9])):
+            clock = FakeClock()
+            pacer = Pacer(policy=policy, clock=clock, sleep=clock.sleep)
+            sent = []
+            for index in pacer.schedule(offsets):
+                sent.append(index)
+                if index == 0:
+                    clock.now += 45_000_000  # Stall for 45 ms after the first send
+            self.assertEqual(sent, expected, policy)
+            self.assertEqual(pacer.skipped, 10 - len(expected))
+        
+    def test_real_clock(self):
+        pacer = Pacer(spin=0.002)
+        sent = list(pacer.schedule(i / 500 for i in range(20)))
+        self.assertEqual(len(sent), 20)
+        self.assertIn('20 sent, 0 skipped', pacer.summary())
+        
+    def test_rejects_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            Pacer(policy='rewind')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+import unittest
+import pandas as pd
+from freed_capture import CaptureWriter
+from freed_codec import PACKET_SIZE, encode_many, parse_freed_packet
+from freed_replayer import create_freed_packet, encode_log_chunks, encode_replay, prefetch
+
+class TestFreeDReplayer(unittest.TestCase):
+    def test_encode_matches_create_packet(self):
+        rows = [(1, 100.5, -200.25, 300.0, 45.5, -30.25, 0.001, 0.5, 0.25),
+                (0xFFFFFFFF, -0.01, 0.0, 12345.678, -179.99, 89.9, -0.3, 0.0, 1.0)]
+        buffer = encode_many(*zip(*rows))
+        
+        self.assertEqual(len(buffer), 2 * PACKET_SIZE)
+        for index, row in enumerate(rows):
+            self.assertEqual(buffer[index * PACKET_SIZE:(index + 1) * PACKET_SIZE],
+                             create_freed_packet(*row))
+        
+    def test_encode_replay_skips_invalid_rows(self):
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(['2024-01-01 00:00:00.000', '2024-01-01 00:00:00.010',
+                                         '2024-01-01 00:00:00.025']),
+            'valid': [False, True, True],
+            'frame': [float('nan'), 7, 8],
+            'x_pos': [float('nan'), 1.0, 2.0], 'y_pos': [float('nan'), 0.0, 0.0],
+            'z_pos': [float('nan'), 0.0, 0.0], 'pan': [float('nan'), 10.0, 11.0],
+            'tilt': [float('nan'), 0.0, 0.0], 'roll': [float('nan'), 0.0, 0.0],
+            'zoom': [float('nan'), 0.0, 0.0], 'focus': [float('nan'), 0.0, 0.0],
+        })
+        buffer, offsets = encode_replay(df)
+        
+        self.assertEqual(offsets.tolist(), [0.01, 0.025])
+        packet, is_valid = parse_freed_packet(buffer[PACKET_SIZE:])
+        self.assertTrue(is_valid)
+        self.assertEqual((packet.frame_number, packet.x_pos, packet.pan), (8, 2.0, 11.0))
+        
+    def temp_path(self, suffix):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        return path
+        
+    def test_stream_csv_in_chunks(self):
+        path = self.temp_path('.csv')
+        with open(path, 'w') as f:
+            f.write('timestamp,source_ip,source_port,valid,frame,x_pos,y_pos,z_pos,pan,tilt,roll,zoom,focus\n')
+            f.write('2024-01-01 00:00:00.000000,10.0.0.1,5000,False,,,,,,,,,\n')
+            for frame in range(1, 8):
+                f.write(f'2024-01-01 00:00:00.{frame * 10:03d}000,10.0.0.1,5000,True,'
+                        f'{frame},{frame}.5,0,0,0,0,0,0,0\n')
+        
+        chunks = list(encode_log_chunks(path, chunk_size=3, speed_factor=2.0))
+        
+        # Send times stay relative to the first log row across chunks
+        self.assertEqual([times for _, times, _ in chunks],
+                         [[0.005, 0.01], [0.015, 0.02, 0.025], [0.03, 0.035]])
+        self.assertEqual(chunks[-1][2], 1.0)
+        packet, is_valid = parse_freed_packet(chunks[1][0][:PACKET_SIZE])
+        self.assertTrue(is_valid)
+        self.assertEqual((packet.frame_number, packet.x_pos), (3, 3.5))
+        
+    def test_stream_capture_in_chunks(self):
+        path = self.temp_path('.fdcap')
+        with CaptureWriter(path) as writer:
+            for frame in range(5):
+                writer.write(1_000_000_000 + frame * 20_000_000, ('10.0.0.1', 5000), True,
+                             create_freed_packet(frame, 0, 0, 0, frame, 0, 0))
+        
+        chunks = list(encode_log_chunks(path, chunk_size=2))
+        
+        self.assertEqual([len(buffer) // PACKET_SIZE for buffer, _, _ in chunks], [2, 2, 1])
+        self.assertEqual([progress for _, _, progress in chunks], [0.4, 0.8, 1.0])
+        self.assertAlmostEqual(chunks[2][1][0], 0.08)
+        packet, _ = parse_freed_packet(chunks[2][0])
+        self.assertEqual(packet.pan, 4.0)
+
+    def test_prefetch(self):
+        self.assertEqual(list(prefetch(iter(range(10)), depth=2)), list(range(10)))
+        
+        def failing():
+            yield 1
+            raise ValueError('broken log')
+        items = prefetch(failing())
+        self.assertEqual(next(items), 1)
+        with self.assertRaisesRegex(ValueError, 'broken log'):
+            next(items)
+        
+    def test_prefetch_close_stops_reader(self):
+        produced = []
+        
+        def endless():
+            while True:
+                produced.append(None)
+                yield len(produced)
+        items = prefetch(endless(), depth=1)
+        self.assertEqual(next(items), 1)
+        items.close()
+        time.sleep(0.3)
+        count = len(produced)
+        time.sleep(0.2)
+        self.assertEqual(len(produced), count)
+        self.assertLessEqual(count, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import socket
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from freed_capture import CaptureReader
+from freed_codec import parse_freed_packet
+from freed_simulator import (
+    PATTERNS, CameraSpec, PatternTable, generate_capture, parse_camera, pattern_arrays,
+    simulate_cameras
+)
+
+class TestFreeDSimulator(unittest.TestCase):
+    def test_parse_camera(self):
+        self.assertEqual(parse_camera('circle'), CameraSpec('circle', 0.0, 0.0))
+        self.assertEqual(parse_camera('figure8:120:0.25'), CameraSpec('figure8', 120.0, 0.25))
+        for value in ('spiral', 'circle:fast', 'circle:60:0:1'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_camera(value)
+        
+    def test_pattern_table_patches_frame_number(self):
+        table = PatternTable('figure8', 60, phase=0.25)
+        self.assertEqual(table.length, 600)
+        
+        for frame in (0, 59, 600 + 59, 0xFFFFFFFF + 7):
+            packet, is_valid = parse_freed_packet(bytes(table.packet(frame)))
+            self.assertTrue(is_valid)
+            self.assertEqual(packet.frame_number, frame & 0xFFFFFFFF)
+            x, y, z, pan, tilt, roll = PATTERNS['figure8'](frame / 60 + 2.5)
+            self.assertAlmostEqual(packet.x_pos, x, delta=1 / 32)
+            self.assertAlmostEqual(packet.y_pos, y, delta=1 / 32)
+            self.assertAlmostEqual(packet.pan, pan, delta=1e-3)
+        
+    def test_multi_camera_load(self):
+        cameras = [CameraSpec('circle', 200.0, 0.0), CameraSpec('figure8', 100.0, 0.5),
+                   CameraSpec('oscillate', 50.0, 0.0)]
+        for precompute in (False, True):
+            with self.subTest(precompute=precompute):
+                receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                receiver.bind(('127.0.0.1', 0))
+                receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+                self.addCleanup(receiver.close)
+                
+                states = simulate_cameras(cameras, *receiver.getsockname(), duration=0.1,
+                                          precompute=precompute)
+                
+                self.assertEqual([camera.sent for camera in states], [20, 10, 5])
+                receiver.settimeout(1.0)
+                frames = {}
+                for _ in range(35):
+                    data, addr = receiver.recvfrom(64)
+                    packet, is_valid = parse_freed_packet(data)
+                    self.assertTrue(is_valid)
+                    frames.setdefault(addr, []).append(packet.frame_number)
+                # One source port per camera, each with its own in-order frame sequence
+                self.assertEqual(sorted(map(len, frames.values())), [5, 10, 20])
+                for sequence in frames.values():
+                    self.assertEqual(sequence, list(range(len(sequence))))
+        
+    def test_pattern_arrays_match_scalar_patterns(self):
+        t = np.linspace(0, 20, 97)
+        for name, function in PATTERNS.items():
+            expected = np.array([function(value) for value in t], dtype=float).T
+            np.testing.assert_allclose(np.array(pattern_arrays(name, t)), expected, atol=1e-9)
+        
+    def test_generate_capture_offline(self):
+        directory = tempfile.mkdtemp()
+        capture_path = os.path.join(directory, 'synthetic.fdcap')
+        csv_path = os.path.join(directory, 'synthetic.csv')
+        self.addCleanup(lambda: [os.remove(capture_path), os.remove(csv_path), os.rmdir(directory)])
+        
+        written = generate_capture([capture_path, csv_path], 'circle', 10.0, 100, noise=1.0,
+                                   dropout=0.05, reorder=0.05, seed=7, source=('10.1.2.3', 40000),
+                                   chunk_frames=300)
+        
+        with CaptureReader(capture_path) as reader:
+            self.assertEqual(len(reader), written)
+            frames = reader.decode().frame_number.astype(np.int64)
+            timestamps = reader.timestamps_ns.astype(np.int64)
+            self.assertEqual(list(reader.source_ips()[:1]), ['10.1.2.3'])
+        self.assertTrue(900 < written < 1000)        # ~5% dropped
+        self.assertTrue((np.diff(timestamps) > 0).all())  # Arrival order
+        self.assertTrue((np.diff(frames) < 0).any())      # Some reordered
+        self.assertEqual(sorted(frames), sorted(set(frames)))
+        
+        df = pd.read_csv(csv_path)
+        self.assertEqual(len(df), written)
+        self.assertTrue(df['valid'].all())
+        self.assertEqual(df['frame'].tolist(), frames.tolist())
+        self.assertEqual((df['source_ip'][0], df['source_port'][0]), ('10.1.2.3', 40000))
+
+if __name__ == '__main__':
+    unittest.main()
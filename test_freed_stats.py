@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+from freed_stats import LatencyHistogram, RunningStats, StreamTracker
+
+class TestStreamTracker(unittest.TestCase):
+    def feed(self, tracker, frames):
+        return [tracker.update(frame) for frame in frames]
+        
+    def test_in_sequence(self):
+        tracker = StreamTracker()
+        self.assertEqual(self.feed(tracker, range(100)), [None] * 100)
+        self.assertEqual((tracker.lost, tracker.duplicates, tracker.out_of_order), (0, 0, 0))
+        self.assertEqual(tracker.loss_rate, 0.0)
+        
+    def test_gap_then_late_arrival(self):
+        tracker = StreamTracker()
+        kinds = self.feed(tracker, [1, 2, 3, 6, 5, 5, 7, 4, 4])
+        
+        self.assertEqual(kinds, [None, None, None, 'gap', 'out_of_order', 'duplicate',
+                                 None, 'out_of_order', 'duplicate'])
+        self.assertEqual(tracker.gaps, 1)
+        self.assertEqual(tracker.lost, 0)
+        self.assertEqual(tracker.out_of_order, 2)
+        self.assertEqual(tracker.duplicates, 2)
+        self.assertEqual(tracker.expected, 7)
+        
+    def test_loss_rate(self):
+        tracker = StreamTracker()
+        self.feed(tracker, [0, 1, 5, 6, 7])
+        self.assertEqual(tracker.lost, 3)
+        self.assertAlmostEqual(tracker.loss_rate, 3 / 8)
+        gap = tracker.anomalies[-1]
+        self.assertEqual((gap.kind, gap.frame, gap.expected, gap.count), ('gap', 5, 2, 3))
+        
+    def test_wraparound_and_reset(self):
+        tracker = StreamTracker()
+        kinds = self.feed(tracker, [0xFFFFFFFE, 0xFFFFFFFF, 0, 2, 1])
+        self.assertEqual(kinds, [None, None, None, 'gap', 'out_of_order'])
+        self.assertEqual((tracker.wraps, tracker.lost), (1, 0))
+        
+        # A large backwards jump is a sender restart, not a late packet
+        self.assertEqual(tracker.update(0x40000000), 'gap')
+        self.assertEqual(tracker.update(0), 'reset')
+        self.assertEqual(tracker.update(1), None)
+        self.assertEqual(tracker.resets, 1)
+        
+    def test_huge_forward_jump(self):
+        tracker = StreamTracker()
+        kinds = self.feed(tracker, [0, 0x7FFFFFFF, 0x7FFFFFFE, 0x80000000])
+        self.assertEqual(kinds, [None, 'gap', 'out_of_order', None])
+        self.assertEqual(tracker.lost, 0x7FFFFFFE - 1)
+        self.assertLess(tracker._holes.bit_length(), tracker.window + 1)
+        
+    def test_anomaly_history_is_bounded(self):
+        tracker = StreamTracker(history=4)
+        self.feed(tracker, range(0, 40, 2))
+        self.assertEqual(len(tracker.anomalies), 4)
+        self.assertEqual(tracker.gaps, 19)
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 11):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertEqual(histogram.percentile(100), 10)
+        self.assertEqual(histogram.mean, 5.5)
+        
+    def test_percentile_relative_error(self):
+        histogram = LatencyHistogram()
+        values = [16_666_667 + (i % 100) * 1000 for i in range(10000)] + [50_000_000]
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for percent in (50, 99, 99.9):
+            exact = values[int(len(values) * percent / 100) - 1]
+            self.assertLessEqual(abs(histogram.percentile(percent) - exact) / exact, 1 / 16)
+        self.assertEqual(histogram.percentile(100), 50_000_000)
+        self.assertEqual(histogram.max, 50_000_000)
+        
+    def test_merge_and_overflow(self):
+        a = LatencyHistogram(max_value=1 << 20)
+        b = LatencyHistogram(max_value=1 << 20)
+        a.record(100)
+        b.record(1 << 30)  # Beyond max_value: top bucket, exact max kept
+        a.merge(b)
+        self.assertEqual(a.count, 2)
+        self.assertEqual(a.max, 1 << 30)
+        self.assertEqual(a.percentile(100), 1 << 30)
+        a.reset()
+        self.assertEqual((a.count, a.summary()), (0, 'no samples'))
+        
+    def test_record_many_matches_record(self):
+        values = [-5, 0, 1, 31, 32, 33, 1000, 16_666_667, (1 << 45) + 123]
+        one, many = LatencyHistogram(), LatencyHistogram()
+        for value in values:
+            one.record(value)
+        many.record_many(np.array(values[:4]))
+        many.record_many(values[4:])
+        many.record_many([])
+        self.assertEqual(many.counts, one.counts)
+        self.assertEqual((many.count, many.total, many.max), (one.count, one.total, one.max))
+
+class TestRunningStats(unittest.TestCase):
+    def test_chunked_updates_match_numpy(self):
+        values = np.random.default_rng(1).normal(33.3, 2.0, 1001)
+        stats = RunningStats()
+        for chunk in np.array_split(values, 7):
+            stats.update(chunk)
+        stats.update([float('nan'), float('inf')])  # Ignored
+        
+        self.assertEqual(stats.count, len(values))
+        self.assertAlmostEqual(stats.mean, values.mean())
+        self.assertAlmostEqual(stats.std, values.std(ddof=1))
+        self.assertEqual((stats.min, stats.max), (values.min(), values.max()))
+        self.assertEqual(RunningStats().variance, 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,19 @@
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
 import unittest
-from freed_validator import FreeDPacket, parse_freed_packet
+from freed_codec import (
+    FreeDPacket, RecvPool, encode_freed_packet, encode_freed_packet_into, encode_many,
+    parse_freed_packet, parse_freed_packets, parse_freed_buffer
+)
+from freed_display import SummaryDisplay
+from freed_server import FreeDServer, SourceHandler, run_workers
 
 class TestFreeDValidator(unittest.TestCase):
     def test_valid_packet_basic(self):
@@ -83,6 +97,232 @@ class TestFreeDValidator(unittest.TestCase):
         packet, is_valid = parse_freed_packet(packet_data)
         self.assertFalse(is_valid)
         self.assertIsNone(packet)
+        
+    def test_parse_batch(self):
+        # Batch parsing matches per-packet parsing, including memoryviews
+        lens_packet = bytes.fromhex(
+            '440102' '000003E8' '00010000' 'FFFF8000' '00020000'
+            '00004000' 'FFFFD555' '00000000' '00008000' '00004000'
+        )
+        buffers = [
+            lens_packet,
+            memoryview(bytearray(lens_packet)),
+            lens_packet[:31],           # No lens data
+            lens_packet[:37],           # Truncated lens data
+            bytes.fromhex('45' + '00' * 38),
+        ]
+        results = parse_freed_packets(buffers)
+        
+        self.assertEqual([valid for _, valid in results], [True, True, True, False, False])
+        for data, (packet, is_valid) in zip(buffers, results):
+            self.assertEqual((packet, is_valid), parse_freed_packet(data))
+        self.assertAlmostEqual(results[1][0].focus, 0.5)
+        self.assertEqual(results[2][0].zoom, 0.0)
+        
+    def test_parse_buffer(self):
+        # Bulk decoding of concatenated fixed-size records
+        lens_packet = bytes.fromhex(
+            '440102' '000003E8' '00010000' 'FFFF8000' '00020000'
+            '00004000' 'FFFFD555' '00000000' '00008000' '00004000'
+        )
+        invalid_packet = bytes.fromhex('45') + lens_packet[1:]
+        columns = parse_freed_buffer(lens_packet + invalid_packet + lens_packet)
+        
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(list(columns.valid), [True, False, True])
+        packet, _ = parse_freed_packet(lens_packet)
+        self.assertEqual(columns.frame_number[0], packet.frame_number)
+        self.assertAlmostEqual(columns.y_pos[2], packet.y_pos)
+        self.assertAlmostEqual(columns.tilt[2], packet.tilt)
+        self.assertAlmostEqual(columns.focus[0], 0.5)
+        
+        short = parse_freed_buffer(lens_packet[:31] * 2, record_size=31)
+        self.assertEqual(list(short.zoom), [0.0, 0.0])
+        with self.assertRaises(ValueError):
+            parse_freed_buffer(lens_packet[:-1])
+        
+    def test_encode_packet(self):
+        # Encoding is the exact inverse of the wire layout, in place or batched
+        lens_packet = bytes.fromhex(
+            '440102' '000003E8' '00010000' 'FFFF8000' '00020000'
+            '00004000' 'FFFFD555' '00000000' '00008000' '00004000'
+        )
+        pose = (1024.0, -512.0, 2048.0, 0.5, -10923 / 32768, 0.0, 1.0, 0.5)
+        self.assertEqual(encode_freed_packet(1000, *pose), lens_packet)
+        self.assertEqual(encode_freed_packet(1000, *pose, packet_id=0x45)[:1], b'\x45')
+        
+        buffer = bytearray(50)
+        encode_freed_packet_into(buffer, 5, 1000, *pose)
+        self.assertEqual(bytes(buffer[5:44]), lens_packet)
+        self.assertEqual(bytes(buffer[:5] + buffer[44:]), bytes(11))
+        
+        frames = [1000, 1000 + 2 ** 32]
+        self.assertEqual(encode_many(frames, *zip(pose, pose)), lens_packet * 2)
+        out = bytearray(78)
+        self.assertIs(encode_many(frames, *pose[:-2], zoom=1.0, focus=0.5, out=out), out)
+        self.assertEqual(bytes(out), lens_packet * 2)
+        with self.assertRaises(ValueError):
+            encode_many(frames, *pose, out=bytearray(39))
+        
+    def test_recv_pool_drains_queue(self):
+        # All queued datagrams are returned as views into the pool slots
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(receiver.close)
+        self.addCleanup(sender.close)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.setblocking(False)
+        
+        payloads = [bytes([0x44, 0x01, 0x02, i]) * 10 for i in range(5)]
+        for payload in payloads:
+            sender.sendto(payload, receiver.getsockname())
+        
+        pool = RecvPool(slots=8, slot_size=64)
+        batch = pool.receive(receiver, timeout=1.0)
+        
+        self.assertEqual([bytes(view) for view, _, _ in batch], payloads)
+        self.assertTrue(all(isinstance(view, memoryview) for view, _, _ in batch))
+        self.assertEqual(batch[0][1][1], sender.getsockname()[1])
+        arrivals = [arrival_ns for _, _, arrival_ns in batch]
+        self.assertEqual(arrivals, sorted(arrivals))
+        self.assertEqual(pool.datagrams, 5)
+        self.assertEqual(pool.receive(receiver, timeout=0), [])
+        
+    def test_server_tracks_sources_across_ports(self):
+        # One event loop serves several ports with a handler per source
+        packet = bytes.fromhex('440102' '00000001' + '00' * 32)
+        
+        async def exercise(batch):
+            server = FreeDServer([('127.0.0.1', 0), ('127.0.0.1', 0)], batch=batch)
+            await server.start()
+            senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(2)]
+            try:
+                for sender, address in zip(senders, server.bound_addresses):
+                    sender.sendto(packet, address)
+                    sender.sendto(b'bad', address)
+                for _ in range(100):
+                    if sum(h.packets for h in server.sources.values()) == 4:
+                        break
+                    await asyncio.sleep(0.01)
+                return server.sources, [s.getsockname()[1] for s in senders]
+            finally:
+                server.close()
+                for sender in senders:
+                    sender.close()
+        
+        for batch in (True, False):
+            sources, ports = asyncio.run(exercise(batch))
+            self.assertEqual(sorted(addr[1] for addr in sources), sorted(ports))
+            for handler in sources.values():
+                self.assertEqual((handler.valid, handler.invalid), (1, 1))
+                self.assertEqual(handler.last_packet.frame_number, 1)
+        
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT not available')
+    def test_servers_share_port_with_reuse_port(self):
+        # Worker servers can bind the same port side by side
+        async def exercise():
+            first = FreeDServer([('127.0.0.1', 0)], verbose=False, reuse_port=True)
+            await first.start()
+            second = FreeDServer(first.bound_addresses, verbose=False, reuse_port=True)
+            try:
+                await second.start()
+                return first.bound_addresses, second.bound_addresses
+            finally:
+                first.close()
+                second.close()
+        
+        first, second = asyncio.run(exercise())
+        self.assertEqual(first, second)
+
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT not available')
+    def test_workers_merge_counters(self):
+        # Totals published by each worker through shared memory are summed
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.bind(('127.0.0.1', 0))
+            address = probe.getsockname()
+        results = []
+        output = io.StringIO()
+        
+        def run():
+            with contextlib.redirect_stdout(output):
+                results.append(run_workers([address], 2, report_interval=0.1))
+        thread = threading.Thread(target=run)
+        thread.start()
+        
+        # Wait until a worker holds the port (a plain bind then fails)
+        for _ in range(500):
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                try:
+                    probe.bind(address)
+                except OSError:
+                    break
+            time.sleep(0.01)
+        time.sleep(0.2)
+        
+        senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(8)]
+        try:
+            for sender in senders:
+                for frame in range(5):
+                    sender.sendto(encode_freed_packet(frame, 0, 0, 0, 0, 0, 0), address)
+                sender.sendto(b'bad', address)
+            time.sleep(0.5)
+        finally:
+            for sender in senders:
+                sender.close()
+            for process in multiprocessing.active_children():
+                os.kill(process.pid, signal.SIGINT)
+            thread.join(10)
+        
+        self.assertEqual(results, [(48, 40, 8)])
+        self.assertIn('Total: 48 packets, 40 valid, 8 invalid', output.getvalue())
+        
+    def test_source_handler_counts_frame_gaps(self):
+        # Missing frames are counted, including across 32-bit wraparound
+        handler = SourceHandler(('127.0.0.1', 50000), verbose=False)
+        for frame in (0xFFFFFFFD, 0xFFFFFFFE, 1, 2, 5, 6):
+            packet = FreeDPacket(0x44, 0x01, 0x02, frame, 0, 0, 0, 0, 0, 0, 0, 0)
+            handler.handle(b'', packet, True)
+        handler.handle(b'bad', None, False)
+        
+        self.assertEqual((handler.packets, handler.valid, handler.invalid), (7, 6, 1))
+        self.assertEqual(handler.stream.lost, 4)
+        self.assertEqual(handler.stream.wraps, 1)
+        self.assertEqual(handler.last_packet.frame_number, 6)
+        
+    def test_source_handler_records_intervals(self):
+        handler = SourceHandler(('127.0.0.1', 50000), verbose=False, nominal_rate=1000)
+        for frame in range(4):
+            handler.handle(b'', FreeDPacket(0x44, 0x01, 0x02, frame, 0, 0, 0, 0, 0, 0, 0, 0), True)
+            time.sleep(0.002)
+        
+        self.assertEqual(handler.intervals.count, 3)
+        self.assertEqual(handler.deviations.count, 3)
+        self.assertGreaterEqual(handler.intervals.percentile(50), 1_900_000)
+        self.assertIn('nominal 1000 Hz', handler.report())
+        
+    def test_source_handler_uses_arrival_stamps(self):
+        # Intervals come from the receive stamps, not from when handle() runs
+        handler = SourceHandler(('127.0.0.1', 50000), verbose=False, nominal_rate=1000)
+        for frame, arrival_ns in enumerate((0, 1_000_000, 2_000_000, 3_500_000)):
+            handler.handle(b'', FreeDPacket(0x44, 0x01, 0x02, frame, 0, 0, 0, 0, 0, 0, 0, 0), True,
+                           10_000_000 + arrival_ns)
+        
+        self.assertEqual(handler.intervals.count, 3)
+        self.assertEqual(handler.intervals.max, 1_500_000)
+        self.assertEqual(handler.deviations.max, 500_000)
+        self.assertEqual(handler.last_arrival, 13_500_000)
+        
+    def test_summary_display_renders_sources(self):
+        handler = SourceHandler(('10.0.0.5', 40000), verbose=False)
+        handler.handle(b'', FreeDPacket(0x44, 0x01, 0x02, 42, 1.5, 2.5, 3.5, 45.0, -30.0, 0.0, 0, 0), True)
+        output = io.StringIO()
+        
+        SummaryDisplay({handler.address: handler}, stream=output).render()
+        
+        text = output.getvalue()
+        self.assertIn('10.0.0.5:40000', text)
+        self.assertIn('100.0', text)
+        self.assertIn('45.00', text)
 
 if __name__ == '__main__':
     unittest.main()